@@ -1,31 +1,153 @@
+import asyncio
+import queue
 import sqlite3
 import pandas as pd
-from typing import Generator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
 import os
 import threading
 
 DATABASE_URL = "legacy_guardians.db"
 
-# Thread-local storage for database connections
-_local = threading.local()
+# Read-only connections kept open for concurrent queries (writes use one more)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+# Prepared statements sqlite3 keeps per connection, keyed by SQL text
+DB_STATEMENT_CACHE = int(os.getenv("DB_STATEMENT_CACHE", "256"))
 
 
-def get_db() -> Generator[sqlite3.Connection, None, None]:
-    """Get database connection (thread-safe)"""
-    if not hasattr(_local, 'conn') or _local.conn is None:
-        _local.conn = sqlite3.connect(DATABASE_URL, check_same_thread=False)
-        _local.conn.row_factory = sqlite3.Row
-        # Enable WAL mode for better concurrency
-        _local.conn.execute("PRAGMA journal_mode=WAL")
+def connect(readonly: bool = False, path: Optional[str] = None) -> sqlite3.Connection:
+    """Open a new connection with the app's row factory and WAL enabled"""
+    conn = sqlite3.connect(
+        path or DATABASE_URL,
+        timeout=30,
+        check_same_thread=False,
+        cached_statements=DB_STATEMENT_CACHE,
+    )
+    conn.row_factory = sqlite3.Row
+    # Enable WAL mode so readers never wait on the writer
+    conn.execute("PRAGMA journal_mode=WAL")
+    # Durable at every checkpoint; safe with WAL and much cheaper per commit
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if readonly:
+        conn.execute("PRAGMA query_only=ON")
+    return conn
 
-    try:
-        yield _local.conn
-    except Exception:
-        # If there's an error, close the connection and create a new one
-        if hasattr(_local, 'conn') and _local.conn:
-            _local.conn.close()
-            _local.conn = None
-        raise
+
+class Database:
+    """
+    Async access to SQLite without blocking the event loop.
+
+    Reads borrow one of at most ``pool_size`` read-only connections and run
+    on a matching thread pool; with WAL they proceed while a write commits.
+    Writes are queued on a single writer thread with its own connection, so
+    they are serialized instead of failing with "database is locked".
+    Connections live for the whole process, so sqlite3's per-connection
+    statement cache turns repeated queries into prepared-statement reuse.
+    """
+
+    def __init__(self, path: Optional[str] = None, pool_size: int = DB_POOL_SIZE):
+        self.path = path
+        self.pool_size = pool_size
+        self._readers: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._opened = 0
+        self._open_lock = threading.Lock()
+        self._writer: Optional[sqlite3.Connection] = None
+
+        self.read_executor = ThreadPoolExecutor(
+            max_workers=pool_size, thread_name_prefix="db-read")
+        self.write_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="db-write")
+
+        self.reads = 0
+        self.writes = 0
+        self.write_errors = 0
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+        with self._open_lock:
+            if self._opened < self.pool_size:
+                self._opened += 1
+                return connect(readonly=True, path=self.path)
+        # Pool exhausted: wait for a connection to come back
+        return self._readers.get()
+
+    def _run_read(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        conn = self._acquire()
+        try:
+            return fn(conn)
+        finally:
+            self._readers.put(conn)
+
+    def _run_write(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        if self._writer is None:
+            self._writer = connect(path=self.path)
+        try:
+            # Commits on success, rolls back everything fn did on error
+            with self._writer:
+                return fn(self._writer)
+        except Exception:
+            self.write_errors += 1
+            raise
+
+    async def read(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run fn(conn) with a pooled read-only connection off the event loop"""
+        self.reads += 1
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.read_executor, self._run_read, fn)
+
+    async def write(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Queue fn(conn) on the single writer; it runs as one transaction"""
+        self.writes += 1
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.write_executor, self._run_write, fn)
+
+    async def fetchall(self, sql: str, params: Sequence[Any] = ()) -> List[sqlite3.Row]:
+        return await self.read(lambda conn: conn.execute(sql, params).fetchall())
+
+    async def fetchone(self, sql: str, params: Sequence[Any] = ()) -> Optional[sqlite3.Row]:
+        return await self.read(lambda conn: conn.execute(sql, params).fetchone())
+
+    async def execute(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """Run one write statement; returns the affected row count"""
+        return await self.write(lambda conn: conn.execute(sql, params).rowcount)
+
+    def close(self):
+        """Close every connection once queued writes finish (reopened lazily)"""
+        self.write_executor.submit(self._close_writer).result()
+        with self._open_lock:
+            while True:
+                try:
+                    self._readers.get_nowait().close()
+                except queue.Empty:
+                    break
+                self._opened -= 1
+
+    def _close_writer(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pool_size": self.pool_size,
+            "readers_open": self._opened,
+            "readers_idle": self._readers.qsize(),
+            "reads": self.reads,
+            "writes": self.writes,
+            "write_errors": self.write_errors,
+        }
+
+
+# Process-wide pool shared by every request
+db_pool = Database()
+
+
+async def get_db() -> Database:
+    """FastAPI dependency: the shared pooled database"""
+    return db_pool
 
 
 def init_db():
@@ -48,6 +170,17 @@ def init_db():
         )
     """)
 
+    # Date window already requested upstream per ticker (so gaps can be
+    # fetched incrementally and empty ranges aren't re-requested)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS price_coverage (
+            ticker TEXT PRIMARY KEY,
+            start_date DATE,
+            end_date DATE,
+            refreshed_at TIMESTAMP
+        )
+    """)
+
     # Events table
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS events (
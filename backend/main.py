@@ -1,33 +1,44 @@
-from services.investment_metrics_service import InvestmentMetricsService
+from services.investment_metrics_service import InvestmentMetricsService, metrics_cache
 from services.leaderboard_service import LeaderboardService
 from services.coach_service import CoachService
 from services.yield_sim_service import YieldSimService
 from services.rebalance_service import RebalanceService
-from services.optimization_service import OptimizationService
-from services.simulation_service import SimulationService
-from services.price_service import PriceService
+from services.backtest_service import BacktestService
+from services.optimization_service import OptimizationService, frontier_cache
+from services.simulation_service import SimulationService, simulation_cache
+from services.price_service import PriceService, normalize_tickers
+from services.market_data import FixtureProvider
+from services.market_data_fetcher import market_data_fetcher
+from services.synthetic_price_service import SyntheticPriceService, series_cache
+from services.payload_cache import PayloadCache, canonical_key
+from services.quote_service import ID_TO_SYMBOL, quote_service
+from services.upstream_guard import history_guard, quotes_guard
+from services.serialization import FastJSONResponse
+from services.streaming import (
+    NDJSON_MEDIA_TYPE, SSE_MEDIA_TYPE, SSE_KEEPALIVE_SECONDS,
+    ndjson_lines, price_records, sse_event, wants_ndjson
+)
+from services.event_metrics_store import event_metrics_store
 from services.coach_chat import CoachChatService
 from services.email_service import EmailService
 from models import (
-    PriceRequest, SimulationRequest, OptimizationRequest,
-    RebalanceRequest, YieldSimRequest, CoachRequest, CoachResponse,
-    LeaderboardSubmit, LeaderboardResponse, RewardRedeemRequest, RewardRedeemResponse, CoachReplyRequest, CoachReplyResponse
+    SimulationRequest, SimulationResponse, MonteCarloRequest, OptimizationRequest,
+    OptimizationBatchRequest, OptimizationBatchResponse, RebalanceBatchRequest,
+    BacktestRequest, BacktestResponse,
+    RebalanceRequest, YieldSimRequest, CoachRequest,
+    LeaderboardSubmit, RewardRedeemRequest, RewardRedeemResponse, CoachReplyRequest, CoachReplyResponse
 )
-from database import get_db, init_db
+from database import Database, db_pool, get_db, init_db
 from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 import uvicorn
-from typing import List, Dict, Any, Optional
+import asyncio
+from typing import List, Optional
 import pandas as pd
-import numpy as np
 from datetime import datetime, timedelta
-import sqlite3
-import yfinance as yf
-import json
 import os
 import uuid
-from functools import lru_cache
 from dotenv import load_dotenv
 
 
@@ -37,34 +48,11 @@ load_dotenv()
 # Import our modules
 
 
-def safe_float(value):
-    """Convert value to safe float for JSON serialization"""
-    if pd.isna(value) or np.isnan(value) or np.isinf(value):
-        return 0.0
-    return float(value)
-
-
-def safe_json_serializer(obj):
-    """Custom JSON serializer to handle NaN and infinite values"""
-    if pd.isna(obj) or np.isnan(obj) or np.isinf(obj):
-        return 0.0
-    if isinstance(obj, (np.integer, np.int64)):
-        return int(obj)
-    if isinstance(obj, (np.floating, np.float64)):
-        return safe_float(obj)
-    if isinstance(obj, np.ndarray):
-        return obj.tolist()
-    if isinstance(obj, pd.Series):
-        return obj.tolist()
-    if isinstance(obj, pd.DataFrame):
-        return obj.to_dict('records')
-    return obj
-
-
 app = FastAPI(
     title="NUVC Financial Literacy API",
     description="AI-Powered Investment Education Platform for Australian Teenagers",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
 # Request ID tracking middleware
@@ -111,16 +99,7 @@ app.add_middleware(
 
 @app.exception_handler(ValueError)
 async def value_error_handler(request: Request, exc: ValueError):
-    """Handle ValueError (including NaN serialization errors)"""
-    if "Out of range float values are not JSON compliant" in str(exc):
-        return JSONResponse(
-            status_code=500,
-            content={
-                "error": "Data serialization error",
-                "message": "Invalid numeric values detected in response data",
-                "details": "Please try again or contact support if the issue persists"
-            }
-        )
+    """Handle ValueError as a bad request (non-finite floats serialize as null)"""
     return JSONResponse(
         status_code=400,
         content={"error": "Bad Request", "message": str(exc)}
@@ -139,26 +118,39 @@ async def general_exception_handler(request: Request, exc: Exception):
         }
     )
 
-# ID to yfinance ticker mapping
-ID_TO_SYMBOL = {
-    "apple": "AAPL",
-    "microsoft": "MSFT",
-    "nvidia": "NVDA",
-    "tesla": "TSLA",
-    "sp500": "SPY",   # S&P500 ETF
-    "etf": "VT",      # Vanguard Total World ETF
-    # Crypto supported by Yahoo Finance spot ETFs, e.g., BTC-USD, ETH-USD
-    "bitcoin": "BTC-USD",
-    "ethereum": "ETH-USD",
-}
-
-
 # Initialize database
 
 
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    event_metrics_store.load()
+    # Load the local price snapshot (if any), then precompute event windows
+    # missing from the artifact, in the background
+    # (the reference on app.state keeps the task from being garbage-collected)
+    app.state.warmup_task = asyncio.create_task(warm_caches(os.getenv("PRICE_SNAPSHOT")))
+    app.state.warmup_task.add_done_callback(log_warmup_failure)
+    quote_service.start()
+
+
+async def warm_caches(snapshot_path: Optional[str] = None):
+    if snapshot_path:
+        await PriceService().prewarm(FixtureProvider(snapshot_path), db_pool)
+    await InvestmentMetricsService().warm_event_metrics(db_pool)
+
+
+def log_warmup_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        print(f"❌ Cache warm-up failed: {task.exception()!r}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    warmup_task = getattr(app.state, "warmup_task", None)
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    await quote_service.stop()
+    db_pool.close()
 
 # Root path
 
@@ -188,7 +180,7 @@ async def root():
 
 
 @app.get("/health")
-async def health_check(db: sqlite3.Connection = Depends(get_db)):
+async def health_check(db: Database = Depends(get_db)):
     """Comprehensive health check"""
     health_status = {
         "status": "healthy",
@@ -197,13 +189,31 @@ async def health_check(db: sqlite3.Connection = Depends(get_db)):
             "database": "unknown",
             "openai": "unknown"
         },
+        "caches": {
+            "prices": price_cache.stats(),
+            "synthetic_series": series_cache.stats(),
+            "investment_metrics": metrics_cache.stats(),
+            "simulations": simulation_cache.stats(),
+            "efficient_frontiers": frontier_cache.stats()
+        },
+        "upstream": {
+            "provider": market_data_fetcher.provider.name,
+            "history": history_guard.stats(),
+            "quotes": quotes_guard.stats(),
+            "workers": market_data_fetcher.stats()
+        },
+        "quotes": {
+            "source": quote_service.source,
+            "stale_seconds": quote_service.get_quotes([])["stale_seconds"],
+            "stream_subscribers": quote_service.subscriber_count
+        },
+        "database": db.stats(),
         "version": "1.0.0"
     }
     
     # Check database
     try:
-        cursor = db.cursor()
-        cursor.execute("SELECT 1")
+        await db.fetchone("SELECT 1")
         health_status["services"]["database"] = "connected"
     except:
         health_status["services"]["database"] = "disconnected"
@@ -249,194 +259,132 @@ async def get_events():
         ]
 
 
-# Price data cache
-price_cache: Dict[str, tuple] = {}
+# Price data cache (bounded LRU shared by all /prices requests)
 CACHE_TTL = timedelta(hours=1)
-
-def get_cached_price_data(cache_key: str) -> Optional[Dict]:
-    """Get cached price data if still valid"""
-    if cache_key in price_cache:
-        data, timestamp = price_cache[cache_key]
-        if datetime.now() - timestamp < CACHE_TTL:
-            return data
-    return None
-
-def set_price_cache(cache_key: str, data: Dict):
-    """Cache price data with timestamp"""
-    price_cache[cache_key] = (data, datetime.now())
+price_cache = PayloadCache(
+    "prices",
+    max_entries=int(os.getenv("PRICE_CACHE_MAX_ENTRIES", "64")),
+    max_bytes=int(os.getenv("PRICE_CACHE_MAX_MB", "256")) * 1024 * 1024,
+    ttl=CACHE_TTL,
+)
+synthetic_price_service = SyntheticPriceService()
 
 
 @app.get("/prices")
 async def get_prices(
+    request: Request,
     tickers: str,
     period: str = "1y",
-    db: sqlite3.Connection = Depends(get_db)
+    layout: str = Query("records", pattern="^(records|columnar)$"),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    max_points: Optional[int] = Query(
+        None, ge=3, le=20000, description="Aggregate daily bars into at most this many candles"),
+    db: Database = Depends(get_db)
 ):
-    """Get historical prices with caching"""
-    cache_key = f"{tickers}_{period}"
-    
-    # Check cache first
-    cached_data = get_cached_price_data(cache_key)
-    if cached_data:
-        return {
-            **cached_data,
-            "cached": True,
-            "timestamp": datetime.now().isoformat()
-        }
-    
-    # Generate fresh data
-    ticker_list = tickers.split(",")
+    """Get historical prices with caching (layout=columnar returns one list per field)"""
+    ticker_list = normalize_tickers(tickers)
+
+    if wants_ndjson(format, request.headers.get("accept")):
+        # One line per ticker chunk, converted straight from the column arrays
+        dates = synthetic_price_service.get_dates(max_points=max_points)
+
+        def records():
+            for ticker in ticker_list:
+                columns = synthetic_price_service.get_columns(ticker, max_points=max_points)
+                yield from price_records(ticker, dates, columns, layout)
+
+        return StreamingResponse(ndjson_lines(records()), media_type=NDJSON_MEDIA_TYPE)
+
+    cache_key = canonical_key(
+        "prices", tickers=ticker_list, period=period, layout=layout, max_points=max_points)
 
     # Generate mock data spanning from 1990 to current year
-    start_year = 1990
-    current_year = datetime.now().year
-    dates = pd.date_range(
-        start=f"{start_year}-01-01", end=f"{current_year}-12-31", freq="D")
-    data = {}
-
-    for ticker in ticker_list:
-        np.random.seed(hash(ticker) % 2**32)
-
-        # Create realistic multi-decade trend with market cycles
-        years = current_year - start_year + 1
-        base_price = 100
-
-        # Create different trends for different assets
-        if ticker == "VTI":  # Stock market - long term growth with cycles
-            # 200% growth over 30+ years
-            trend = np.linspace(0, 2.0, len(dates))
-            # Add market cycles (boom and bust)
-            # 7-year cycle
-            cycle1 = 0.3 * \
-                np.sin(2 * np.pi * np.arange(len(dates)) / (365 * 7))
-            # 3-year cycle
-            cycle2 = 0.1 * \
-                np.sin(2 * np.pi * np.arange(len(dates)) / (365 * 3))
-            noise = np.random.randn(len(dates)) * 0.02
-            prices = base_price * (1 + trend + cycle1 + cycle2 + noise)
-
-        elif ticker == "BND":  # Bonds - steady growth
-            # 80% growth over 30+ years
-            trend = np.linspace(0, 0.8, len(dates))
-            noise = np.random.randn(len(dates)) * 0.005
-            prices = base_price * (1 + trend + noise)
-
-        elif ticker == "GLD":  # Gold - volatile but upward
-            # 120% growth over 30+ years
-            trend = np.linspace(0, 1.2, len(dates))
-            volatility = 0.3 * \
-                np.sin(2 * np.pi * np.arange(len(dates)) / (365 * 5))
-            noise = np.random.randn(len(dates)) * 0.03
-            prices = base_price * (1 + trend + volatility + noise)
-
-        else:  # Default for other assets
-            # 150% growth over 30+ years
-            trend = np.linspace(0, 1.5, len(dates))
-            noise = np.random.randn(len(dates)) * 0.02
-            prices = base_price * (1 + trend + noise)
-
-        # Ensure prices don't go negative
-        prices = np.maximum(prices, base_price * 0.1)
-
-        # Ensure all prices are safe for JSON
-        prices = [safe_float(price) for price in prices]
-
-        ticker_data = []
-        for i, date in enumerate(dates):
-            ticker_data.append({
-                "date": date.strftime("%Y-%m-%d"),
-                "open": safe_float(prices[i] * 0.99),
-                "high": safe_float(prices[i] * 1.01),
-                "low": safe_float(prices[i] * 0.98),
-                "close": safe_float(prices[i]),
-                "volume": int(np.random.uniform(1000000, 5000000))
-            })
-
-        data[ticker] = ticker_data
-
-    result = {
+    data, cached = await price_cache.get_or_compute(
+        cache_key,
+        lambda: synthetic_price_service.get_prices(
+            ticker_list, layout=layout, max_points=max_points)
+    )
+
+    # Returned as a response so the payload skips jsonable_encoder
+    return FastJSONResponse({
         "data": data,
-        "cached": False,
+        "cached": cached,
         "timestamp": datetime.now().isoformat()
-    }
-    
-    # Cache the result
-    set_price_cache(cache_key, result)
-    
-    return result
+    })
 
 
-@app.post("/simulate")
+@app.post("/simulate", response_model=SimulationResponse)
 async def simulate_investment(request: SimulationRequest):
     """Simulate investment returns with cash flow breakdown"""
-    # Generate realistic simulation results with extended timeline
-    initial_capital = request.initial_capital
-
-    # Simulate different scenarios based on asset allocation
-    asset_weights = request.asset_weights
-
-    # Calculate expected returns based on asset mix
-    total_return = 0
-    if "VTI" in asset_weights:
-        total_return += asset_weights["VTI"] * 0.08  # 8% for stocks
-    if "BND" in asset_weights:
-        total_return += asset_weights["BND"] * 0.04  # 4% for bonds
-    if "GLD" in asset_weights:
-        total_return += asset_weights["GLD"] * 0.06  # 6% for gold
-
-    # Add some randomness
-    total_return += np.random.normal(0, 0.02)
-
-    # Ensure total_return is safe for calculations
-    total_return = safe_float(total_return)
-
-    final_value = initial_capital * (1 + total_return)
-
-    # Generate performance chart data (yearly from 1990 to current)
-    years = list(range(1990, datetime.now().year + 1))
-    performance_chart = []
-
-    for year in years:
-        # Simulate growth over time with some volatility
-        years_elapsed = year - 1990
-        total_years = len(years)
-
-        # Add some market cycles
-        cycle_factor = 1 + 0.2 * \
-            np.sin(2 * np.pi * years_elapsed / 7)  # 7-year cycle
-        growth_factor = (1 + total_return) ** (years_elapsed /
-                                               total_years) * cycle_factor
-        value = initial_capital * growth_factor
-
-        performance_chart.append({
-            "date": f"{year}-01-01",
-            # Ensure minimum value and safe float
-            "value": safe_float(max(value, initial_capital * 0.1))
-        })
+    simulation_service = SimulationService()
+    return await simulation_service.simulate(request)
 
-    return {
-        "final_value": safe_float(final_value),
-        "total_return": safe_float(total_return),
-        "annualized_return": safe_float(total_return),
-        "volatility": safe_float(0.15 + np.random.normal(0, 0.05)),
-        "sharpe_ratio": safe_float(max(0.1, total_return / 0.15)),
-        "max_drawdown": safe_float(-0.1 - abs(np.random.normal(0, 0.05))),
-        "performance_chart": performance_chart
-    }
+
+@app.post("/simulate/monte-carlo")
+async def simulate_monte_carlo(request: MonteCarloRequest):
+    """Simulate many paths in one batch and return percentile bands"""
+    simulation_service = SimulationService()
+    return await simulation_service.simulate_monte_carlo(request)
 
 
 @app.post("/optimize")
-async def optimize_portfolio(request: OptimizationRequest):
-    """Optimize portfolio using Sharpe ratio"""
+async def optimize_portfolio(
+    request: OptimizationRequest,
+    db: Database = Depends(get_db)
+):
+    """Optimize portfolio on the cached efficient frontier"""
     optimization_service = OptimizationService()
-    return await optimization_service.optimize(request)
+    return await optimization_service.optimize(request, db=db)
+
+
+@app.post("/optimize/batch", response_model=OptimizationBatchResponse)
+async def optimize_portfolio_batch(
+    request: OptimizationBatchRequest,
+    db: Database = Depends(get_db)
+):
+    """Optimize many requests, or one universe over a risk tolerance grid, in one call"""
+    requests = list(request.requests)
+    if request.universe is not None:
+        requests += [
+            request.universe.model_copy(update={"risk_tolerance": risk_tolerance})
+            for risk_tolerance in request.risk_tolerances
+        ]
+    optimization_service = OptimizationService()
+    results = await optimization_service.optimize_batch(requests, db=db)
+    return OptimizationBatchResponse(results=results)
 
 
 @app.post("/rebalance")
 async def rebalance_portfolio(request: RebalanceRequest):
     """Auto-rebalance portfolio to target weights"""
     rebalance_service = RebalanceService()
-    return await rebalance_service.rebalance(request)
+    try:
+        return await rebalance_service.rebalance(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/rebalance/batch")
+async def rebalance_portfolios(request: RebalanceBatchRequest):
+    """Plan rebalancing trades for many portfolios in one call"""
+    rebalance_service = RebalanceService()
+    try:
+        return {"results": await rebalance_service.rebalance_batch(request.portfolios)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/backtest", response_model=BacktestResponse)
+async def backtest_portfolio(
+    request: BacktestRequest,
+    db: Database = Depends(get_db)
+):
+    """Replay stored daily prices with calendar or threshold rebalancing"""
+    backtest_service = BacktestService()
+    try:
+        return await backtest_service.backtest(request, db=db)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.post("/yield-sim")
@@ -456,7 +404,7 @@ async def get_coach_advice(request: CoachRequest):
 @app.post("/leaderboard/submit")
 async def submit_score(
     request: LeaderboardSubmit,
-    db: sqlite3.Connection = Depends(get_db)
+    db: Database = Depends(get_db)
 ):
     """Submit player score to leaderboard"""
     leaderboard_service = LeaderboardService()
@@ -467,7 +415,7 @@ async def submit_score(
 async def get_leaderboard(
     season: str = "current",
     limit: int = 10,
-    db: sqlite3.Connection = Depends(get_db)
+    db: Database = Depends(get_db)
 ):
     """Get top players from leaderboard"""
     leaderboard_service = LeaderboardService()
@@ -478,181 +426,121 @@ async def get_leaderboard(
 
 @app.get("/investment-metrics/{ticker}")
 async def get_investment_metrics(
+    request: Request,
     ticker: str,
     start_date: str,
     end_date: str,
-    initial_investment: float = 100000
+    initial_investment: float = 100000,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    max_points: Optional[int] = Query(
+        None, ge=3, le=20000, description="Downsample chart_data to at most this many points"),
+    db: Database = Depends(get_db)
 ):
-    """Get real investment metrics from historical data"""
+    """Get real investment metrics from historical data (format=ndjson streams chart_data in chunks)"""
     investment_metrics_service = InvestmentMetricsService()
-    return await investment_metrics_service.calculate_investment_metrics(
+    if wants_ndjson(format, request.headers.get("accept")):
+        records = await investment_metrics_service.stream_investment_metrics(
+            ticker=ticker,
+            start_date=start_date,
+            end_date=end_date,
+            initial_investment=initial_investment,
+            db=db,
+            max_points=max_points
+        )
+        return StreamingResponse(ndjson_lines(records), media_type=NDJSON_MEDIA_TYPE)
+
+    metrics = await investment_metrics_service.calculate_investment_metrics(
         ticker=ticker,
         start_date=start_date,
         end_date=end_date,
-        initial_investment=initial_investment
+        initial_investment=initial_investment,
+        db=db,
+        max_points=max_points
     )
+    return FastJSONResponse(metrics)
 
 
 @app.get("/historical-performance/{ticker}/{event_year}")
 async def get_historical_performance(
     ticker: str,
-    event_year: int
+    event_year: int,
+    db: Database = Depends(get_db)
 ):
     """Get performance for a specific historical event"""
     investment_metrics_service = InvestmentMetricsService()
-    return await investment_metrics_service.calculate_historical_performance(
+    return FastJSONResponse(await investment_metrics_service.calculate_historical_performance(
         ticker=ticker,
-        event_year=event_year
-    )
+        event_year=event_year,
+        db=db
+    ))
 
 
 @app.get("/asset-comparison")
 async def get_asset_comparison(
+    request: Request,
     assets: str,
     start_date: str,
-    end_date: str
+    end_date: str,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    max_points: Optional[int] = Query(
+        None, ge=3, le=20000, description="Downsample each chart_data to at most this many points"),
+    db: Database = Depends(get_db)
 ):
-    """Compare performance of multiple assets"""
+    """Compare performance of multiple assets (format=ndjson streams per-asset records)"""
     asset_list = assets.split(",")
     investment_metrics_service = InvestmentMetricsService()
-    return await investment_metrics_service.get_asset_performance_comparison(
+    if wants_ndjson(format, request.headers.get("accept")):
+        records = await investment_metrics_service.stream_asset_comparison(
+            assets=asset_list,
+            start_date=start_date,
+            end_date=end_date,
+            db=db,
+            max_points=max_points
+        )
+        return StreamingResponse(ndjson_lines(records), media_type=NDJSON_MEDIA_TYPE)
+
+    comparison = await investment_metrics_service.get_asset_performance_comparison(
         assets=asset_list,
         start_date=start_date,
-        end_date=end_date
+        end_date=end_date,
+        db=db,
+        max_points=max_points
     )
+    return FastJSONResponse(comparison)
 
 
 @app.get("/quotes")
-def get_quotes(request: Request, ids: List[str] = Query(None)):
-    if not ids:
-        raw = request.query_params.get("ids", "")
-        ids = [x for x in raw.split(",") if x] if raw else []
-
-    syms = {i: ID_TO_SYMBOL.get(i) for i in ids if ID_TO_SYMBOL.get(i)}
-    if not syms:
-        return {"quotes": []}
-
-    print(f"🔍 Fetching quotes for symbols: {list(syms.values())}")
-
-    # Use longer period to ensure sufficient data
-    try:
-        df = yf.download(
-            tickers=list(syms.values()),
-            period="5d",
-            interval="1d",
-            group_by="ticker",
-            auto_adjust=False,
-            progress=False,
-            threads=True,
-        )
-        print(f"📊 Downloaded data shape: {df.shape}")
-        print(f"📊 Data columns: {df.columns}")
-
-        if df.empty:
-            print("⚠️ No data downloaded, using fallback")
-            return {"quotes": _get_fallback_quotes(syms)}
-
-    except Exception as e:
-        print(f"❌ Error downloading data: {e}")
-        return {"quotes": _get_fallback_quotes(syms)}
-
-    results = []
-    for _id, sym in syms.items():
+async def get_quotes(ids: List[str] = Query(None)):
+    """Latest quotes from the in-memory cache kept fresh by the background refresher"""
+    # Accept ?ids=a&ids=b as well as ?ids=a,b
+    ids = [x for raw in ids or [] for x in raw.split(",") if x]
+    return quote_service.get_quotes(ids)
+
+
+@app.get("/quotes/stream")
+async def stream_quotes(request: Request, ids: List[str] = Query(None)):
+    """
+    Server-Sent Events feed of quote updates: a snapshot of the subscribed
+    ids, then only the quotes that changed on each background refresh.
+    """
+    ids = [x for raw in ids or [] for x in raw.split(",") if x]
+    subscription = quote_service.subscribe(ids)
+
+    async def events():
         try:
-            print(f"🔍 Processing {_id} -> {sym}")
-
-            # Compatible with both yfinance return structures (multi/single ticker)
-            if isinstance(df.columns, pd.MultiIndex):
-                if sym in df.columns.levels[0]:
-                    close = df[sym]["Close"]
-                    print(f"📈 MultiIndex data for {sym}: {close.values}")
+            yield sse_event("snapshot", quote_service.get_quotes(ids or list(ID_TO_SYMBOL)))
+            while not await request.is_disconnected():
+                changed = await subscription.next(SSE_KEEPALIVE_SECONDS)
+                if changed:
+                    yield sse_event("quotes", {**quote_service.get_quotes([]), "quotes": changed})
                 else:
-                    print(f"⚠️ Symbol {sym} not found in MultiIndex columns")
-                    continue
-            else:
-                close = df["Close"]
-                print(f"📈 Single ticker data: {close.values}")
-
-            if close.empty:
-                print(f"⚠️ No data for {sym}")
-                continue
-
-            # Find the last valid price (non-nan)
-            valid_prices = close.dropna()
-            if valid_prices.empty:
-                print(f"⚠️ No valid prices for {sym}")
-                continue
-
-            latest = safe_float(valid_prices.iloc[-1])
-
-            # Find the second-to-last valid price for change calculation
-            if len(valid_prices) > 1:
-                prev = safe_float(valid_prices.iloc[-2])
-            else:
-                prev = latest
-
-            print(f"💰 {sym}: latest={latest}, prev={prev}")
-
-            if latest <= 0:
-                print(f"⚠️ Invalid price for {sym}: {latest}")
-                continue
-
-            change = safe_float(((latest - prev) / prev * 100)
-                                if prev and prev > 0 else 0.0)
-
-            results.append({
-                "id": _id,
-                "currentPrice": round(latest, 2),
-                "change": round(change, 2),
-            })
-            print(f"✅ Added quote for {_id}: price={latest}, change={change}%")
-
-        except Exception as e:
-            print(f"❌ Error processing {_id} ({sym}): {e}")
-            continue
-
-    print(f"📊 Final results: {results}")
-
-    # Use fallback data if no data is retrieved
-    if not results:
-        print("🔄 No results obtained, using fallback")
-        return {"quotes": _get_fallback_quotes(syms)}
-
-    return {"quotes": results}
-
-
-def _get_fallback_quotes(syms: Dict[str, str]) -> List[Dict[str, Any]]:
-    """Return fallback quotes when yfinance fails"""
-    print("🔄 Using fallback quotes")
-
-    # Mock price data
-    fallback_prices = {
-        "AAPL": 175.50,
-        "MSFT": 380.25,
-        "NVDA": 850.75,
-        "TSLA": 245.80,
-        "SPY": 450.30,
-        "VT": 95.45,
-        "BTC-USD": 112495.65,
-        "ETH-USD": 4502.13,
-    }
+                    yield b": keepalive\n\n"
+        finally:
+            quote_service.unsubscribe(subscription)
 
-    results = []
-    for _id, sym in syms.items():
-        if sym in fallback_prices:
-            price = fallback_prices[sym]
-            # Simulate small price changes
-            change = round((np.random.random() - 0.5) * 2, 2)  # -1% to +1%
-
-            results.append({
-                "id": _id,
-                "currentPrice": price,
-                "change": change,
-            })
-            print(
-                f"🔄 Fallback quote for {_id}: price={price}, change={change}%")
-
-    return results
+    return StreamingResponse(
+        events(), media_type=SSE_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
 coach_chat_service = CoachChatService()
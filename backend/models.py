@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import List, Dict, Any, Optional, Annotated, Union
 from datetime import datetime
 from enum import Enum
 
@@ -39,6 +39,26 @@ class SimulationRequest(BaseModel):
         30, description="Rebalance frequency in days")
     start_date: Optional[str] = None
     end_date: Optional[str] = None
+    seed: Optional[int] = Field(
+        None, ge=0, description="Random seed; derived from the allocation when omitted")
+
+
+class MonteCarloRequest(SimulationRequest):
+    n_paths: int = Field(
+        1000, ge=1, le=100000, description="Number of simulated paths")
+    chart_points: int = Field(
+        100, ge=2, le=1000, description="Points on the percentile band time grid")
+
+
+class WeightBounds(BaseModel):
+    min: float = Field(0.0, ge=0, le=1)
+    max: float = Field(1.0, ge=0, le=1)
+
+    @model_validator(mode="after")
+    def check_order(self):
+        if self.min > self.max:
+            raise ValueError("min weight exceeds max weight")
+        return self
 
 
 class OptimizationRequest(BaseModel):
@@ -46,16 +66,76 @@ class OptimizationRequest(BaseModel):
     risk_tolerance: float = Field(
         0.5, ge=0, le=1, description="Risk tolerance 0-1")
     target_return: Optional[float] = None
-    constraints: Optional[Dict[str, float]] = None  # Min/max weights per asset
+    # Min/max weights per asset: a number is a max weight, {"min", "max"} sets both
+    constraints: Optional[Dict[str, Union[float, WeightBounds]]] = None
+    lookback_days: int = Field(
+        1095, ge=30, le=3650, description="Price history window for the covariance estimate")
+    shrinkage: Optional[float] = Field(
+        None, ge=0, le=1, description="Covariance shrinkage toward the diagonal; estimated when omitted")
+
+    @model_validator(mode="after")
+    def check_min_weights(self):
+        floors = sum(
+            bound.min for asset, bound in (self.constraints or {}).items()
+            if isinstance(bound, WeightBounds) and asset in self.available_assets)
+        if floors > 1:
+            raise ValueError("min weights sum to more than 1")
+        return self
+
+
+class OptimizationBatchRequest(BaseModel):
+    requests: List[OptimizationRequest] = Field(default_factory=list, max_length=500)
+    # Alternatively, one universe swept over a risk tolerance grid
+    universe: Optional[OptimizationRequest] = None
+    risk_tolerances: List[Annotated[float, Field(ge=0, le=1)]] = Field(
+        default_factory=list, max_length=500)
 
 
 class RebalanceRequest(BaseModel):
-    current_weights: Dict[str, float]
+    current_weights: Dict[str, float] = Field(default_factory=dict)
     target_weights: Dict[str, float]
     rebalance_threshold: float = Field(
-        0.05, description="Threshold for rebalancing")
+        0.05, description="Per-asset tolerance band around the target weight")
     transaction_cost: float = Field(
         0.001, description="Transaction cost as percentage")
+    holdings: Optional[Dict[str, float]] = Field(
+        None, description="Shares held per asset; trades are sized in shares when given")
+    prices: Optional[Dict[str, float]] = Field(
+        None, description="Price per share, required for every held or target asset with holdings")
+    cash: float = Field(0.0, ge=0, description="Uninvested cash available for buys")
+    fractional_shares: bool = True
+    min_trade_value: float = Field(
+        0.0, ge=0, description="Skip trades smaller than this (currency, or weight without holdings)")
+    rebalance_to: str = Field(
+        "target", pattern="^(target|band)$",
+        description="Trade out-of-band assets back to target or only to the band edge")
+
+
+class RebalanceBatchRequest(BaseModel):
+    portfolios: List[RebalanceRequest] = Field(..., max_length=10000)
+
+
+class BacktestRequest(BaseModel):
+    asset_weights: Dict[str, float] = Field(..., description="Target allocation weights")
+    start_date: str = Field(..., description="First date, YYYY-MM-DD")
+    end_date: str = Field(..., description="Last date, YYYY-MM-DD")
+    initial_capital: float = Field(100000, gt=0)
+    rebalance_mode: str = Field("calendar", pattern="^(calendar|threshold|none)$")
+    rebalance_frequency: int = Field(
+        30, ge=1, description="Calendar rebalance interval in days")
+    rebalance_threshold: float = Field(
+        0.05, gt=0, description="Weight drift that triggers a threshold rebalance")
+    transaction_cost: float = Field(
+        0.001, ge=0, description="Transaction cost as percentage")
+
+
+# Sleeve names whose "<name>_income" keys would overwrite the response totals
+RESERVED_SLEEVE_NAMES = {"total", "total_daily", "cumulative"}
+
+
+class YieldSleeve(BaseModel):
+    allocation: float = Field(..., ge=0, le=1)
+    annual_yield: float = Field(..., description="Annual yield or APY")
 
 
 class YieldSimRequest(BaseModel):
@@ -63,10 +143,24 @@ class YieldSimRequest(BaseModel):
     reit_allocation: float = Field(0.2, ge=0, le=1)
     crypto_allocation: float = Field(0.1, ge=0, le=1)
     initial_capital: float = Field(100000)
-    time_horizon: int = Field(365)
+    time_horizon: int = Field(365, ge=1)
     bond_yield: float = Field(0.04, description="Annual bond yield")
     reit_yield: float = Field(0.06, description="Annual REIT yield")
     crypto_apy: float = Field(0.08, description="Annual crypto APY")
+    sleeves: Optional[Dict[str, YieldSleeve]] = Field(
+        None, description="Income sleeves by name; replaces the bond/REIT/crypto fields when given")
+    reinvest: bool = Field(
+        False, description="Reinvest income daily (DRIP) instead of paying it out")
+    chart_points: int = Field(
+        30, ge=1, le=1000, description="Days sampled evenly across the horizon for the chart")
+
+    @field_validator("sleeves")
+    @classmethod
+    def check_sleeve_names(cls, sleeves):
+        reserved = sorted(RESERVED_SLEEVE_NAMES.intersection(sleeves or {}))
+        if reserved:
+            raise ValueError(f"Reserved sleeve names: {', '.join(reserved)}")
+        return sleeves
 
 
 class CoachRequest(BaseModel):
@@ -115,6 +209,31 @@ class SimulationResponse(BaseModel):
     performance_chart: Dict[str, Any]
 
 
+class MonteCarloResponse(BaseModel):
+    n_paths: int
+    expected_final_value: float
+    probability_of_loss: float
+    final_value_percentiles: Dict[str, float]
+    percentile_bands: Dict[str, Any]
+    drawdown_distribution: Dict[str, Any]
+
+
+class BacktestResponse(BaseModel):
+    final_value: float
+    total_return: float
+    annualized_return: float
+    volatility: float
+    sharpe_ratio: float
+    max_drawdown: float
+    rebalance_count: int
+    turnover: float
+    annualized_turnover: float
+    total_transaction_cost: float
+    cost_drag: float
+    rebalance_events: List[Dict[str, Any]]
+    equity_curve: Dict[str, Any]
+
+
 class OptimizationResponse(BaseModel):
     optimal_weights: Dict[str, float]
     expected_return: float
@@ -124,6 +243,10 @@ class OptimizationResponse(BaseModel):
     recommendations: List[str]
 
 
+class OptimizationBatchResponse(BaseModel):
+    results: List[OptimizationResponse]
+
+
 class CoachResponse(BaseModel):
     advice: str
     recommendations: List[str]
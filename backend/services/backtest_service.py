@@ -0,0 +1,181 @@
+import numpy as np
+import pandas as pd
+from datetime import date
+from typing import Dict, List, Any, Optional
+
+from database import Database
+from models import BacktestRequest, BacktestResponse
+from services.price_service import PriceService
+from services.rebalance_service import plan_trades
+
+
+TRADING_DAYS = 252
+RISK_FREE_RATE = 0.02
+
+# Bars scanned at a time when looking for the next threshold breach
+SEARCH_WINDOW = 256
+
+
+def drawdown_series(values: np.ndarray, initial_capital: float) -> np.ndarray:
+    """Fractional drawdown from the running peak (seeded with the initial capital) along the last axis"""
+    peak = np.maximum(np.maximum.accumulate(values, axis=-1), initial_capital)
+    return (peak - values) / peak
+
+
+def calendar_rebalance_indices(dates: pd.DatetimeIndex, frequency_days: int) -> np.ndarray:
+    """First bar on or after every ``frequency_days`` calendar days from the start"""
+    if frequency_days <= 0 or len(dates) < 2:
+        return np.array([], dtype=int)
+    elapsed = (dates - dates[0]).days.to_numpy()
+    due = np.arange(frequency_days, elapsed[-1] + 1, frequency_days)
+    return np.unique(np.searchsorted(elapsed, due))
+
+
+def _next_breach(shares: np.ndarray, cash: float, prices: np.ndarray, weights: np.ndarray, threshold: float, start: int) -> int:
+    """First bar at or after start where any weight drifts past the band, else n_bars"""
+    n_bars = prices.shape[1]
+    for a in range(start, n_bars, SEARCH_WINDOW):
+        b = min(a + SEARCH_WINDOW, n_bars)
+        values = shares[:, None] * prices[:, a:b]
+        drift = np.abs(values / (values.sum(axis=0) + cash) - weights[:, None]).max(axis=0)
+        breached = np.flatnonzero(drift > threshold)
+        if breached.size:
+            return a + int(breached[0])
+    return n_bars
+
+
+def run_backtest(
+    prices: np.ndarray,
+    weights: np.ndarray,
+    initial_capital: float,
+    transaction_cost: float = 0.0,
+    rebalance_indices: Optional[np.ndarray] = None,
+    threshold: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Replay (n_assets, n_bars) prices from a target allocation bought at bar 0.
+
+    Holdings are constant between rebalances, so each segment's equity is a
+    single shares @ prices product. Rebalances happen at the given bar
+    indices (calendar mode) or whenever a weight leaves its band of
+    ``threshold`` (threshold mode), and are priced with plan_trades.
+    """
+    n_bars = prices.shape[1]
+    shares = weights * initial_capital / prices[:, 0]
+    cash = initial_capital - (shares * prices[:, 0]).sum()
+    schedule = iter(rebalance_indices if rebalance_indices is not None else ())
+
+    equity = np.empty(n_bars)
+    events: List[Dict[str, Any]] = []
+    start = 0
+    while True:
+        if threshold is not None:
+            end = _next_breach(shares, cash, prices, weights, threshold, start + 1)
+        else:
+            end = next((int(i) for i in schedule if i > start), n_bars)
+        equity[start:end] = shares @ prices[:, start:end] + cash
+        if end >= n_bars:
+            break
+
+        if transaction_cost == 0:
+            # Costless trades land exactly on target
+            value = shares @ prices[:, end] + cash
+            target_shares = weights * value / prices[:, end]
+            turnover = np.abs(target_shares - shares) @ prices[:, end] / 2 / value
+            shares, cash, cost = target_shares, value - target_shares @ prices[:, end], 0.0
+        else:
+            plan = plan_trades(
+                shares[None], prices[:, end][None], weights[None],
+                cash=np.array([cash]),
+                threshold=np.zeros(1),
+                transaction_cost=np.array([transaction_cost]),
+                fractional=np.ones(1, dtype=bool),
+                min_trade_value=np.zeros(1),
+                to_band=np.zeros(1, dtype=bool),
+            )
+            shares, cash = plan["new_shares"][0], float(plan["new_cash"][0])
+            turnover, cost = plan["turnover"][0], plan["costs"][0].sum()
+        events.append({"index": end, "turnover": float(turnover), "cost": float(cost)})
+        start = end
+
+    return {"equity": equity, "events": events}
+
+
+def equity_metrics(equity: np.ndarray, dates: pd.DatetimeIndex, initial_capital: float) -> Dict[str, float]:
+    """Return, CAGR, volatility, Sharpe and max drawdown of an equity curve"""
+    years = max((dates[-1] - dates[0]).days / 365.25, 1 / 365.25)
+    total_return = equity[-1] / initial_capital - 1
+    annualized_return = (equity[-1] / initial_capital) ** (1 / years) - 1
+    daily_returns = equity[1:] / equity[:-1] - 1
+    volatility = float(np.std(daily_returns) * np.sqrt(TRADING_DAYS)) if daily_returns.size else 0.0
+    return {
+        "total_return": float(total_return),
+        "annualized_return": float(annualized_return),
+        "volatility": volatility,
+        "sharpe_ratio": (annualized_return - RISK_FREE_RATE) / volatility if volatility > 0 else 0.0,
+        "max_drawdown": float(drawdown_series(equity, initial_capital).max()),
+    }
+
+
+class BacktestService:
+    def __init__(self, price_service: Optional[PriceService] = None):
+        self.price_service = price_service or PriceService()
+
+    async def backtest(self, request: BacktestRequest, db: Optional[Database] = None) -> BacktestResponse:
+        """Replay stored daily closes with calendar or threshold rebalancing"""
+        assets = [a for a, w in request.asset_weights.items() if w > 0]
+        if not assets:
+            raise ValueError("asset_weights must contain at least one positive weight")
+
+        frames = await self.price_service.get_frames(
+            assets, date.fromisoformat(request.start_date),
+            date.fromisoformat(request.end_date), db)
+        missing = [a for a in assets if frames.get(a) is None or frames[a].empty]
+        if missing:
+            raise ValueError(f"No price history for {', '.join(missing)}")
+
+        # Bars where every asset has a positive close
+        closes = pd.DataFrame({a: frames[a]["close"].where(frames[a]["close"] > 0) for a in assets}).dropna()
+        if len(closes) < 2:
+            raise ValueError("Not enough overlapping price history for a backtest")
+
+        dates = pd.DatetimeIndex(closes.index)
+        prices = closes.to_numpy().T
+        weights = np.array([request.asset_weights[a] for a in assets])
+        weights = weights / weights.sum()
+
+        indices, threshold = None, None
+        if request.rebalance_mode == "calendar":
+            indices = calendar_rebalance_indices(dates, request.rebalance_frequency)
+        elif request.rebalance_mode == "threshold":
+            threshold = request.rebalance_threshold
+
+        net = run_backtest(prices, weights, request.initial_capital,
+                           request.transaction_cost, indices, threshold)
+        # Same rebalance dates without costs, to isolate what trading costs
+        gross = run_backtest(prices, weights, request.initial_capital, 0.0,
+                             np.array([e["index"] for e in net["events"]], dtype=int))
+
+        metrics = equity_metrics(net["equity"], dates, request.initial_capital)
+        gross_metrics = equity_metrics(gross["equity"], dates, request.initial_capital)
+        years = max((dates[-1] - dates[0]).days / 365.25, 1 / 365.25)
+        turnover = sum(e["turnover"] for e in net["events"])
+        day_strings = dates.strftime("%Y-%m-%d")
+
+        return BacktestResponse(
+            final_value=float(net["equity"][-1]),
+            **metrics,
+            rebalance_count=len(net["events"]),
+            turnover=turnover,
+            annualized_turnover=turnover / years,
+            total_transaction_cost=sum(e["cost"] for e in net["events"]),
+            cost_drag=gross_metrics["annualized_return"] - metrics["annualized_return"],
+            rebalance_events=[
+                {"date": day_strings[e["index"]], "turnover": e["turnover"], "cost": e["cost"]}
+                for e in net["events"]
+            ],
+            equity_curve={
+                "dates": day_strings.tolist(),
+                "values": net["equity"].tolist(),
+            },
+        )
@@ -0,0 +1,66 @@
+import numpy as np
+from typing import Dict, List, Any, Tuple
+
+
+def bucket_edges(n: int, n_buckets: int) -> np.ndarray:
+    """n_buckets + 1 increasing boundaries splitting range(n) into near-equal buckets"""
+    return np.linspace(0, n, n_buckets + 1).round().astype(int)
+
+
+def lttb_indices(y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of at most ``max_points`` samples
+    that keep the visual shape of a line series. The first and last points
+    are always kept; each bucket keeps the point forming the largest triangle
+    with the previously kept point and the next bucket's centroid.
+    """
+    n = len(y)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=float)
+    # Interior buckets cover points 1 .. n - 2
+    edges = bucket_edges(n - 2, max_points - 2) + 1
+    starts, ends = edges[:-1], edges[1:]
+    avg_y = np.add.reduceat(y[1:n - 1], starts - 1) / (ends - starts)
+    avg_x = (starts + ends - 1) / 2
+    next_x = np.append(avg_x[1:], n - 1)
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(max_points, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for b, (lo, hi) in enumerate(zip(starts, ends)):
+        xs = np.arange(lo, hi)
+        area = np.abs((a - next_x[b]) * (y[lo:hi] - y[a]) - (a - xs) * (next_y[b] - y[a]))
+        a = lo + int(area.argmax())
+        selected[b + 1] = a
+    return selected
+
+
+def ohlc_buckets(columns: Dict[str, np.ndarray], max_points: int) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Aggregate OHLCV columns into at most ``max_points`` candles. Returns the
+    first bar index of each bucket (for its date) and the aggregated columns.
+    """
+    n = len(columns["close"])
+    if max_points >= n:
+        return np.arange(n), columns
+
+    edges = bucket_edges(n, max_points)
+    starts = edges[:-1]
+    return starts, {
+        "open": columns["open"][starts],
+        "high": np.maximum.reduceat(columns["high"], starts),
+        "low": np.minimum.reduceat(columns["low"], starts),
+        "close": columns["close"][edges[1:] - 1],
+        "volume": np.add.reduceat(columns["volume"], starts),
+    }
+
+
+def downsample_records(records: List[Dict[str, Any]], max_points: int, field: str) -> List[Dict[str, Any]]:
+    """Keep the LTTB-selected records of a list of chart points, using ``field`` as y"""
+    if max_points >= len(records):
+        return records
+    y = np.fromiter((r[field] for r in records), dtype=float, count=len(records))
+    return [records[i] for i in lttb_indices(y, max_points)]
@@ -0,0 +1,131 @@
+"""
+Precomputed /historical-performance answers stored as memory-mapped arrays.
+
+The event windows and proxy tickers are fixed, so every (ticker, event year)
+pair is computed once by a build step and served from disk afterwards,
+without network access:
+
+    cd backend && python -m services.event_metrics_store
+"""
+import asyncio
+import os
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+
+ARTIFACT_DIR = os.path.join("data", "event_metrics")
+
+SCALAR_FIELDS = [
+    "total_return", "final_value", "volatility",
+    "sharpe_ratio", "max_drawdown", "annualized_return",
+]
+SERIES_FIELDS = ["portfolio_value", "price", "volume"]
+ARRAY_NAMES = ["keys", "windows", "scalars", "offsets", "dates"] + SERIES_FIELDS
+
+
+def _key(ticker: str, event_year: int) -> str:
+    return f"{ticker}|{event_year}"
+
+
+class EventMetricsStore:
+    """Read-only lookup over the event metrics artifact"""
+
+    def __init__(self, path: str = ARTIFACT_DIR):
+        self.path = path
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._index: Dict[str, int] = {}
+
+    def load(self) -> bool:
+        """Memory-map the artifact if it exists; returns whether it loaded"""
+        try:
+            arrays = {
+                name: np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+                for name in ARRAY_NAMES
+            }
+        except (FileNotFoundError, ValueError) as e:
+            print(f"⚠️ Event metrics artifact not loaded: {e}")
+            return False
+
+        self._arrays = arrays
+        self._index = {str(key): i for i, key in enumerate(arrays["keys"])}
+        print(f"📦 Loaded {len(self._index)} precomputed event metrics")
+        return True
+
+    def __contains__(self, pair: Tuple[str, int]) -> bool:
+        return _key(*pair) in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get(self, ticker: str, event_year: int) -> Optional[Dict[str, Any]]:
+        """Metrics and chart data for one pair, or None when not precomputed"""
+        row = self._index.get(_key(ticker, event_year))
+        if row is None:
+            return None
+
+        arrays = self._arrays
+        start, end = int(arrays["offsets"][row]), int(arrays["offsets"][row + 1])
+        scalars = arrays["scalars"][row].tolist()
+        dates = np.datetime_as_string(arrays["dates"][start:end], unit="D").tolist()
+        series = [arrays[name][start:end].tolist() for name in SERIES_FIELDS]
+
+        return {
+            **dict(zip(SCALAR_FIELDS, scalars)),
+            "chart_data": [
+                {"date": d, "portfolio_value": v, "price": p, "volume": vol}
+                for d, v, p, vol in zip(dates, *series)
+            ],
+            "data_points": end - start,
+            "start_date": str(arrays["windows"][row][0]),
+            "end_date": str(arrays["windows"][row][1]),
+            "ticker": ticker,
+            "initial_investment": 100000.0,
+        }
+
+    @staticmethod
+    def write(path: str, results: Dict[Tuple[str, int], Dict[str, Any]]) -> int:
+        """Pack computed metrics into flat arrays (one .npy per field)"""
+        pairs = sorted(results)
+        offsets = np.zeros(len(pairs) + 1, dtype=np.int64)
+        for i, pair in enumerate(pairs):
+            offsets[i + 1] = offsets[i] + len(results[pair]["chart_data"])
+
+        chart = [point for pair in pairs for point in results[pair]["chart_data"]]
+        arrays = {
+            "keys": np.array([_key(*pair) for pair in pairs], dtype=str),
+            "windows": np.array(
+                [[results[p]["start_date"], results[p]["end_date"]] for p in pairs], dtype=str),
+            "scalars": np.array(
+                [[results[p][f] for f in SCALAR_FIELDS] for p in pairs], dtype=np.float64
+            ).reshape(len(pairs), len(SCALAR_FIELDS)),
+            "offsets": offsets,
+            "dates": np.array([point["date"] for point in chart], dtype="datetime64[D]"),
+        }
+        for name in SERIES_FIELDS:
+            arrays[name] = np.array([point[name] for point in chart], dtype=np.float64)
+
+        os.makedirs(path, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(os.path.join(path, f"{name}.npy"), array)
+        return len(pairs)
+
+
+# Process-wide artifact, loaded at startup
+event_metrics_store = EventMetricsStore()
+
+
+async def build(path: str = ARTIFACT_DIR) -> int:
+    """Compute every (event ticker, event year) pair and write the artifact"""
+    from database import db_pool, init_db
+    from services.investment_metrics_service import InvestmentMetricsService
+
+    init_db()
+    results = await InvestmentMetricsService().compute_event_metrics(db_pool)
+    written = EventMetricsStore.write(path, results)
+    print(f"📦 Wrote {written} event metrics to {path}")
+    return written
+
+
+if __name__ == "__main__":
+    asyncio.run(build())
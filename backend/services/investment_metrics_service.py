@@ -1,127 +1,275 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List
-from datetime import datetime, timedelta
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from datetime import date, datetime, timedelta
+
+from database import Database
+from services.downsampling import downsample_records, lttb_indices
+from services.event_metrics_store import event_metrics_store
+from services.payload_cache import PayloadCache, canonical_key
+from services.price_service import PriceService
+from services.price_store import TRAILING_BARS
+from services.streaming import STREAM_CHUNK_ROWS, metrics_records
+
+
+RISK_FREE_RATE = 0.02
+TRADING_DAYS = 252
+
+# Historical event windows served by /historical-performance
+EVENT_PERIODS = {
+    1990: ("1990-01-01", "1990-12-31"),  # Japanese asset bubble
+    2000: ("2000-01-01", "2000-12-31"),  # Dot-com bubble
+    2008: ("2008-01-01", "2008-12-31"),  # Financial crisis
+    2020: ("2020-01-01", "2020-12-31"),  # COVID-19 pandemic
+    # Current challenges (using recent data)
+    2025: ("2023-01-01", "2023-12-31"),
+}
+DEFAULT_EVENT_PERIOD = ("1990-01-01", "1990-12-31")
+
+# Tickers the mission screens ask for (see TICKER_MAP in TeachingDialogue)
+EVENT_TICKERS = [
+    "^N225", "^TYX", "GLD", "^GSPC", "UUP", "^IXIC", "^DJI", "^IRX", "XLF",
+    "JETS", "ICLN", "TIP", "DJP", "VNQ", "^AXJO", "BTC-USD", "ETH-USD",
+]
+
+# Memoized metrics keyed by (ticker, start, end, initial_investment)
+metrics_cache = PayloadCache(
+    "investment_metrics", max_entries=512, max_bytes=64 * 1024 * 1024)
+# How long expired metrics may still be served while one refresh runs
+METRICS_STALE_TTL = timedelta(days=7)
+
+# (historical ticker, event year) -> metrics computed at startup for pairs
+# missing from the on-disk artifact
+_event_metrics: Dict[Tuple[str, int], Dict[str, Any]] = {}
+
+
+class _NoPriceData(Exception):
+    """Raised inside cached computations so empty results aren't memoized"""
+
+
+def compute_series_metrics(close: np.ndarray, initial_investment: float) -> Dict[str, Any]:
+    """Return/volatility/Sharpe/drawdown/annualized metrics in one vectorized pass"""
+    n = len(close)
+    returns = np.zeros(n)
+    returns[1:] = close[1:] / close[:-1] - 1
+
+    growth = np.cumprod(1 + returns)
+    portfolio_value = initial_investment * growth
+    final_value = portfolio_value[-1]
+
+    std = returns.std(ddof=1) if n > 1 else 0.0
+    volatility = std * np.sqrt(TRADING_DAYS)
+    sharpe_ratio = ((returns.mean() - RISK_FREE_RATE / TRADING_DAYS) / std
+                    * np.sqrt(TRADING_DAYS)) if std > 0 else 0.0
+
+    running_max = np.maximum.accumulate(growth)
+    max_drawdown = ((growth - running_max) / running_max).min()
+
+    total_return = (final_value - initial_investment) / initial_investment
+    annualized_return = (final_value / initial_investment) ** (365 / n) - 1
+
+    # Scrub NaN/inf from every scalar in one array op
+    values = np.nan_to_num(np.array([
+        total_return * 100, final_value, volatility * 100, sharpe_ratio,
+        max_drawdown * 100, annualized_return * 100,
+    ], dtype=float), nan=0.0, posinf=0.0, neginf=0.0)
+
+    return {
+        "total_return": float(values[0]),
+        "final_value": float(values[1]),
+        "volatility": float(values[2]),
+        "sharpe_ratio": float(values[3]),
+        "max_drawdown": float(values[4]),
+        "annualized_return": float(values[5]),
+        "portfolio_value": np.nan_to_num(portfolio_value, nan=0.0, posinf=0.0, neginf=0.0),
+    }
 
 
 class InvestmentMetricsService:
-    def __init__(self):
-        pass
+    def __init__(self, price_service: Optional[PriceService] = None):
+        self.price_service = price_service or PriceService()
 
     async def calculate_investment_metrics(
         self,
         ticker: str,
         start_date: str,
         end_date: str,
-        initial_investment: float = 100000
+        initial_investment: float = 100000,
+        db: Optional[Database] = None,
+        max_points: Optional[int] = None
     ) -> Dict[str, Any]:
         """
-        Calculate comprehensive investment metrics from real historical data
+        Calculate comprehensive investment metrics from real historical data,
+        with chart_data downsampled to max_points when given
         """
-        try:
-            # Fetch real historical data
-            stock_data = yf.download(
-                ticker, start=start_date, end=end_date, progress=False, auto_adjust=True
-            )
-
-            if stock_data.empty or len(stock_data) == 0:
-                return self._get_default_metrics()
-
-            # Calculate daily returns
-            stock_data['Returns'] = stock_data['Close'].pct_change()
-            # Fill NaN returns with 0 for the first day
-            stock_data['Returns'] = stock_data['Returns'].fillna(0)
-
-            # Calculate portfolio value over time
-            stock_data['Portfolio_Value'] = initial_investment * \
-                (1 + stock_data['Returns']).cumprod()
-
-            # Calculate metrics
-            total_return = (
-                stock_data['Portfolio_Value'].iloc[-1] - initial_investment) / initial_investment
-            final_value = stock_data['Portfolio_Value'].iloc[-1]
-
-            # Volatility (annualized)
-            volatility = stock_data['Returns'].std() * np.sqrt(252)
-
-            # Sharpe ratio (assuming risk-free rate of 2%)
-            risk_free_rate = 0.02
-            excess_returns = stock_data['Returns'] - risk_free_rate / 252
-            if stock_data['Returns'].std() > 0:
-                sharpe_ratio = excess_returns.mean(
-                ) / stock_data['Returns'].std() * np.sqrt(252)
-            else:
-                sharpe_ratio = 0.0
-
-            # Maximum drawdown
-            cumulative_returns = (1 + stock_data['Returns']).cumprod()
-            running_max = cumulative_returns.expanding().max()
-            drawdown = (cumulative_returns - running_max) / running_max
-            max_drawdown = drawdown.min()
-
-            # Annualized return
-            days = len(stock_data)
-            annualized_return = (
-                (final_value / initial_investment) ** (365 / days)) - 1
-
-            # Prepare chart data
-            chart_data = self._prepare_chart_data(
-                stock_data, initial_investment)
-
-            # Handle NaN values for JSON serialization
-            def safe_float(value):
-                if pd.isna(value) or np.isnan(value) or np.isinf(value):
-                    return 0.0
-                return float(value)
-
-            return {
-                "total_return": safe_float(total_return * 100),
-                "final_value": safe_float(final_value),
-                "volatility": safe_float(volatility * 100),
-                "sharpe_ratio": safe_float(sharpe_ratio),
-                "max_drawdown": safe_float(max_drawdown * 100),
-                "annualized_return": safe_float(annualized_return * 100),
-                "chart_data": chart_data,
-                "data_points": len(stock_data),
-                "start_date": start_date,
-                "end_date": end_date,
-                "ticker": ticker,
-                "initial_investment": initial_investment
-            }
+        key = self._cache_key(ticker, start_date, end_date, initial_investment)
+
+        async def compute():
+            # Read from the local price store, gap-filling from upstream
+            frames = await self.price_service.get_frames(
+                [ticker], date.fromisoformat(start_date), date.fromisoformat(end_date), db)
+            return self._compute_metrics(
+                ticker, frames.get(ticker), start_date, end_date, initial_investment)
 
+        try:
+            metrics, _ = await metrics_cache.get_or_compute(
+                key, compute, ttl=self._cache_ttl(end_date), stale_ttl=METRICS_STALE_TTL)
+            return self._downsampled(metrics, key, max_points, end_date)
+        except _NoPriceData:
+            return self._get_default_metrics()
         except Exception as e:
             print(f"Error calculating metrics for {ticker}: {e}")
-            import traceback
-            traceback.print_exc()
             return self._get_default_metrics()
 
-    def _prepare_chart_data(self, stock_data: pd.DataFrame, initial_investment: float) -> List[Dict[str, Any]]:
-        """Prepare chart data for frontend visualization"""
-        chart_data = []
+    async def stream_investment_metrics(
+        self,
+        ticker: str,
+        start_date: str,
+        end_date: str,
+        initial_investment: float = 100000,
+        db: Optional[Database] = None,
+        max_points: Optional[int] = None,
+        chunk_rows: int = STREAM_CHUNK_ROWS
+    ) -> Iterator[Dict[str, Any]]:
+        """NDJSON records for calculate_investment_metrics without building the full chart_data"""
+        key = self._cache_key(ticker, start_date, end_date, initial_investment)
+        cached = metrics_cache.get(key)
+        if cached is not None:
+            return metrics_records(
+                ticker, self._downsampled(cached, key, max_points, end_date), chunk_rows)
 
-        # Define safe_value function outside the loop for better performance
-        def safe_value(value):
-            # Handle pandas Series properly
-            if hasattr(value, 'iloc'):
-                val = value.iloc[0]
-            else:
-                val = value
+        try:
+            frames = await self.price_service.get_frames(
+                [ticker], date.fromisoformat(start_date), date.fromisoformat(end_date), db)
+            return self._series_records(
+                ticker, frames.get(ticker), start_date, end_date, initial_investment,
+                max_points, chunk_rows)
+        except _NoPriceData:
+            pass
+        except Exception as e:
+            print(f"Error calculating metrics for {ticker}: {e}")
+        return metrics_records(ticker, self._get_default_metrics(), chunk_rows)
+
+    def _cache_key(self, ticker: str, start_date: str, end_date: str, initial_investment: float) -> str:
+        return canonical_key(
+            "metrics", ticker=ticker, start=start_date, end=end_date,
+            initial_investment=float(initial_investment))
+
+    def _downsampled(self, metrics: Dict[str, Any], key: str, max_points: Optional[int], end_date: str) -> Dict[str, Any]:
+        """Metrics with an LTTB-reduced chart_data, cached per resolution"""
+        if max_points is None or len(metrics["chart_data"]) <= max_points:
+            return metrics
+        resolution_key = f"{key}|max_points={max_points}"
+        reduced = metrics_cache.get(resolution_key)
+        if reduced is None:
+            reduced = {
+                **metrics,
+                "chart_data": downsample_records(metrics["chart_data"], max_points, "portfolio_value"),
+            }
+            metrics_cache.set(resolution_key, reduced, ttl=self._cache_ttl(end_date))
+        return reduced
+
+    def _cache_ttl(self, end_date: str) -> timedelta:
+        """Windows that ended before the trailing bars never change"""
+        try:
+            closed = date.fromisoformat(end_date) < datetime.now().date() - TRAILING_BARS
+        except ValueError:
+            closed = False
+        return timedelta(days=1) if closed else timedelta(hours=1)
+
+    def _compute_metrics(
+        self,
+        ticker: str,
+        stock_data: Optional[pd.DataFrame],
+        start_date: str,
+        end_date: str,
+        initial_investment: float
+    ) -> Dict[str, Any]:
+        """Compute metrics and chart data from a date-indexed OHLCV frame"""
+        metrics, stock_data, portfolio_value = self._series_metrics(
+            ticker, stock_data, initial_investment)
+
+        return {
+            **metrics,
+            "chart_data": self._prepare_chart_data(stock_data, portfolio_value),
+            **self._summary_fields(ticker, stock_data, start_date, end_date, initial_investment)
+        }
+
+    def _series_metrics(self, ticker: str, stock_data: Optional[pd.DataFrame], initial_investment: float) -> Tuple[Dict[str, Any], pd.DataFrame, np.ndarray]:
+        """Scalar metrics, the frame without gap rows and the portfolio value series"""
+        if stock_data is None or stock_data.empty:
+            raise _NoPriceData(ticker)
 
-            # Handle NaN values
-            if pd.isna(val) or np.isnan(val) or np.isinf(val):
-                return 0.0
-            return float(val)
+        # Zero closes are scrubbed gaps in the store, not real prices
+        stock_data = stock_data[stock_data["close"] > 0]
+        if stock_data.empty:
+            raise _NoPriceData(ticker)
 
-        for date, row in stock_data.iterrows():
-            chart_data.append({
-                "date": date.strftime("%Y-%m-%d"),
-                "portfolio_value": safe_value(row['Portfolio_Value']),
-                "price": safe_value(row['Close']),
-                "volume": safe_value(row['Volume'])
-            })
+        close = stock_data["close"].to_numpy(dtype=float)
+        metrics = compute_series_metrics(close, initial_investment)
+        portfolio_value = metrics.pop("portfolio_value")
+        return metrics, stock_data, portfolio_value
+
+    def _summary_fields(self, ticker: str, stock_data: pd.DataFrame, start_date: str, end_date: str, initial_investment: float) -> Dict[str, Any]:
+        return {
+            "data_points": len(stock_data),
+            "start_date": start_date,
+            "end_date": end_date,
+            "ticker": ticker,
+            "initial_investment": initial_investment
+        }
 
-        return chart_data
+    def _prepare_chart_data(self, stock_data: pd.DataFrame, portfolio_value: np.ndarray, rows: Any = slice(None)) -> List[Dict[str, Any]]:
+        """Prepare chart data for frontend visualization (optionally only the given rows)"""
+        dates = stock_data.index[rows].strftime("%Y-%m-%d").tolist()
+        prices = np.nan_to_num(stock_data["close"].to_numpy(dtype=float)[rows])
+        volumes = np.nan_to_num(stock_data["volume"].to_numpy(dtype=float)[rows])
+
+        return [
+            {"date": d, "portfolio_value": v, "price": p, "volume": vol}
+            for d, v, p, vol in zip(
+                dates, portfolio_value[rows].tolist(), prices.tolist(), volumes.tolist())
+        ]
+
+    def _series_records(
+        self,
+        ticker: str,
+        stock_data: Optional[pd.DataFrame],
+        start_date: str,
+        end_date: str,
+        initial_investment: float,
+        max_points: Optional[int],
+        chunk_rows: int
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Streamed records computed straight from the price columns: the
+        summary is ready once the metrics pass is done, and each chart_data
+        chunk is built from its own slice of rows (LTTB-selected when
+        max_points is given). Raises _NoPriceData before anything is yielded.
+        """
+        metrics, stock_data, portfolio_value = self._series_metrics(
+            ticker, stock_data, initial_investment)
+        summary = {
+            **metrics,
+            **self._summary_fields(ticker, stock_data, start_date, end_date, initial_investment)
+        }
+        if max_points is not None and len(portfolio_value) > max_points:
+            rows = lttb_indices(portfolio_value, max_points)
+        else:
+            rows = np.arange(len(portfolio_value))
+
+        def records():
+            yield {"ticker": ticker, "type": "summary", "metrics": summary}
+            for start in range(0, len(rows), chunk_rows):
+                yield {
+                    "ticker": ticker,
+                    "type": "chart_data",
+                    "offset": start,
+                    "chart_data": self._prepare_chart_data(
+                        stock_data, portfolio_value, rows[start:start + chunk_rows]),
+                }
+
+        return records()
 
     def _get_default_metrics(self) -> Dict[str, Any]:
         """Return default metrics when data is unavailable"""
@@ -186,56 +334,166 @@ class InvestmentMetricsService:
     async def calculate_historical_performance(
         self,
         ticker: str,
-        event_year: int
+        event_year: int,
+        db: Optional[Database] = None
     ) -> Dict[str, Any]:
         """
         Calculate performance for a specific historical event period
         """
-        # Define event periods based on historical events
-        event_periods = {
-            1990: ("1990-01-01", "1990-12-31"),  # Japanese asset bubble
-            2000: ("2000-01-01", "2000-12-31"),  # Dot-com bubble
-            2008: ("2008-01-01", "2008-12-31"),  # Financial crisis
-            2020: ("2020-01-01", "2020-12-31"),  # COVID-19 pandemic
-            # Current challenges (using recent data)
-            2025: ("2023-01-01", "2023-12-31"),
-        }
-
-        start_date, end_date = event_periods.get(
-            event_year, ("1990-01-01", "1990-12-31"))
-
         # Get the appropriate historical ticker
         historical_ticker = self._get_historical_ticker(ticker, event_year)
 
+        precomputed = (event_metrics_store.get(historical_ticker, event_year)
+                       or _event_metrics.get((historical_ticker, event_year)))
+        if precomputed is not None:
+            return precomputed
+
+        start_date, end_date = EVENT_PERIODS.get(
+            event_year, DEFAULT_EVENT_PERIOD)
+
         return await self.calculate_investment_metrics(
             ticker=historical_ticker,
             start_date=start_date,
             end_date=end_date,
-            initial_investment=100000
+            initial_investment=100000,
+            db=db
         )
 
+    async def compute_event_metrics(self, db: Optional[Database] = None, skip=()) -> Dict[Tuple[str, int], Dict[str, Any]]:
+        """Metrics for every (event ticker, event year) pair not in skip"""
+        results = {}
+        for event_year, (start_date, end_date) in EVENT_PERIODS.items():
+            tickers = sorted({
+                self._get_historical_ticker(ticker, event_year) for ticker in EVENT_TICKERS
+            } - {ticker for ticker, year in skip if year == event_year})
+            if not tickers:
+                continue
+            try:
+                frames = await self.price_service.get_frames(
+                    tickers, date.fromisoformat(start_date), date.fromisoformat(end_date), db)
+            except Exception as e:
+                print(f"Error computing {event_year} event metrics: {e}")
+                continue
+
+            for ticker in tickers:
+                try:
+                    results[(ticker, event_year)] = self._compute_metrics(
+                        ticker, frames.get(ticker), start_date, end_date, 100000)
+                except _NoPriceData:
+                    continue
+
+        return results
+
+    async def warm_event_metrics(self, db: Optional[Database] = None) -> int:
+        """
+        Fill in event pairs the on-disk artifact doesn't cover so
+        /historical-performance is served from memory. Returns pairs loaded.
+        """
+        pairs = {
+            (self._get_historical_ticker(ticker, year), year)
+            for year in EVENT_PERIODS for ticker in EVENT_TICKERS
+        }
+        covered = {pair for pair in pairs if pair in event_metrics_store}
+        results = await self.compute_event_metrics(db, skip=covered)
+        _event_metrics.update(results)
+        print(f"📈 Precomputed {len(results)} historical event metrics")
+        return len(results)
+
+    async def stream_asset_comparison(
+        self,
+        assets: List[str],
+        start_date: str,
+        end_date: str,
+        db: Optional[Database] = None,
+        max_points: Optional[int] = None,
+        chunk_rows: int = STREAM_CHUNK_ROWS
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        NDJSON records for get_asset_performance_comparison: cached assets
+        are replayed, the rest are streamed asset by asset from one batched
+        frame load without materializing their chart_data lists.
+        """
+        cached = {}
+        for asset in assets:
+            metrics = metrics_cache.get(self._cache_key(asset, start_date, end_date, 100000))
+            if metrics is not None:
+                cached[asset] = metrics
+        missing = [asset for asset in assets if asset not in cached]
+
+        frames = {}
+        if missing:
+            try:
+                frames = await self.price_service.get_frames(
+                    missing, date.fromisoformat(start_date), date.fromisoformat(end_date), db)
+            except Exception as e:
+                print(f"Error fetching comparison data for {missing}: {e}")
+
+        def records():
+            for asset in assets:
+                if asset in cached:
+                    key = self._cache_key(asset, start_date, end_date, 100000)
+                    yield from metrics_records(
+                        asset, self._downsampled(cached[asset], key, max_points, end_date), chunk_rows)
+                    continue
+                try:
+                    asset_records = self._series_records(
+                        asset, frames.get(asset), start_date, end_date, 100000,
+                        max_points, chunk_rows)
+                except _NoPriceData:
+                    asset_records = metrics_records(asset, self._get_default_metrics(), chunk_rows)
+                except Exception as e:
+                    print(f"Error comparing asset {asset}: {e}")
+                    asset_records = metrics_records(asset, self._get_default_metrics(), chunk_rows)
+                yield from asset_records
+
+        return records()
+
     async def get_asset_performance_comparison(
         self,
         assets: List[str],
         start_date: str,
-        end_date: str
+        end_date: str,
+        db: Optional[Database] = None,
+        max_points: Optional[int] = None
     ) -> Dict[str, Dict[str, Any]]:
         """
         Compare performance of multiple assets over a specified period
         """
         results = {}
-
+        missing = []
         for asset in assets:
+            cached = metrics_cache.get(
+                self._cache_key(asset, start_date, end_date, 100000))
+            if cached is not None:
+                results[asset] = cached
+            else:
+                missing.append(asset)
+
+        if missing:
+            # One batched store read / upstream download for every missing asset
             try:
-                metrics = await self.calculate_investment_metrics(
-                    ticker=asset,
-                    start_date=start_date,
-                    end_date=end_date,
-                    initial_investment=100000
-                )
-                results[asset] = metrics
+                frames = await self.price_service.get_frames(
+                    missing, date.fromisoformat(start_date), date.fromisoformat(end_date), db)
             except Exception as e:
-                print(f"Error comparing asset {asset}: {e}")
-                results[asset] = self._get_default_metrics()
+                print(f"Error fetching comparison data for {missing}: {e}")
+                frames = {}
 
-        return results
+            for asset in missing:
+                try:
+                    results[asset] = self._compute_metrics(
+                        asset, frames.get(asset), start_date, end_date, 100000)
+                    metrics_cache.set(
+                        self._cache_key(asset, start_date, end_date, 100000),
+                        results[asset], ttl=self._cache_ttl(end_date))
+                except _NoPriceData:
+                    results[asset] = self._get_default_metrics()
+                except Exception as e:
+                    print(f"Error comparing asset {asset}: {e}")
+                    results[asset] = self._get_default_metrics()
+
+        return {
+            asset: self._downsampled(
+                results[asset], self._cache_key(asset, start_date, end_date, 100000),
+                max_points, end_date)
+            for asset in assets
+        }
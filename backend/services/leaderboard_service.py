@@ -1,27 +1,42 @@
-import sqlite3
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from datetime import datetime
+from database import Database
 from models import LeaderboardSubmit, LeaderboardResponse
 
 
+SUBMIT_SQL = """
+    INSERT OR REPLACE INTO leaderboard
+    (player_id, player_name, season, total_score, risk_adjusted_return,
+     completed_missions, exploration_breadth, portfolio_performance, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+RANK_SQL = """
+    SELECT COUNT(*) + 1 as rank
+    FROM leaderboard
+    WHERE season = ? AND total_score > ?
+"""
+
+TOP_PLAYERS_SQL = """
+    SELECT player_name, total_score, risk_adjusted_return,
+           completed_missions, exploration_breadth, created_at
+    FROM leaderboard
+    WHERE season = ?
+    ORDER BY total_score DESC, risk_adjusted_return DESC
+    LIMIT ?
+"""
+
+
 class LeaderboardService:
     def __init__(self):
         pass
 
-    async def submit_score(self, request: LeaderboardSubmit, db: sqlite3.Connection = None) -> Dict[str, Any]:
+    async def submit_score(self, request: LeaderboardSubmit, db: Optional[Database] = None) -> Dict[str, Any]:
         """Submit player score to leaderboard"""
         if not db:
             return {"success": False, "message": "Database connection required"}
 
-        cursor = db.cursor()
-
-        # Insert or update player score
-        cursor.execute("""
-            INSERT OR REPLACE INTO leaderboard 
-            (player_id, player_name, season, total_score, risk_adjusted_return, 
-             completed_missions, exploration_breadth, portfolio_performance, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+        params = (
             request.player_id,
             request.player_name,
             request.season,
@@ -31,18 +46,14 @@ class LeaderboardService:
             request.exploration_breadth,
             str(request.portfolio_performance),
             datetime.now().isoformat()
-        ))
-
-        db.commit()
+        )
 
-        # Get updated rank
-        cursor.execute("""
-            SELECT COUNT(*) + 1 as rank
-            FROM leaderboard 
-            WHERE season = ? AND total_score > ?
-        """, (request.season, request.total_score))
+        def submit(conn):
+            # Insert or update player score, then rank it in the same transaction
+            conn.execute(SUBMIT_SQL, params)
+            return conn.execute(RANK_SQL, (request.season, request.total_score)).fetchone()
 
-        rank_result = cursor.fetchone()
+        rank_result = await db.write(submit)
         rank = rank_result[0] if rank_result else 1
 
         return {
@@ -53,23 +64,12 @@ class LeaderboardService:
             "total_score": request.total_score
         }
 
-    async def get_top_players(self, season: str = "current", limit: int = 10, db: sqlite3.Connection = None) -> List[LeaderboardResponse]:
+    async def get_top_players(self, season: str = "current", limit: int = 10, db: Optional[Database] = None) -> List[LeaderboardResponse]:
         """Get top players from leaderboard"""
         if not db:
             return []
 
-        cursor = db.cursor()
-
-        cursor.execute("""
-            SELECT player_name, total_score, risk_adjusted_return, 
-                   completed_missions, exploration_breadth, created_at
-            FROM leaderboard 
-            WHERE season = ?
-            ORDER BY total_score DESC, risk_adjusted_return DESC
-            LIMIT ?
-        """, (season, limit))
-
-        results = cursor.fetchall()
+        results = await db.fetchall(TOP_PLAYERS_SQL, (season, limit))
 
         leaderboard = []
         for i, row in enumerate(results):
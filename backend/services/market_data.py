@@ -0,0 +1,295 @@
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from services.synthetic_price_service import SyntheticPriceService, series_cache
+
+
+# (symbol, first date, last date) - both ends inclusive
+Window = Tuple[str, date, date]
+# (symbol, first date, last date, frame or None when the download failed)
+FetchResult = Tuple[str, date, date, Optional[pd.DataFrame]]
+
+# Windows whose edges are this close are served from one download
+WINDOW_SLACK = timedelta(days=31)
+
+
+def split_frame(df: pd.DataFrame, symbol: str) -> Optional[pd.DataFrame]:
+    """Extract one symbol's OHLCV columns from a (multi-)ticker download"""
+    if df is None or df.empty:
+        return None
+    if not isinstance(df.columns, pd.MultiIndex):
+        return df
+    for level in range(df.columns.nlevels):
+        if symbol in df.columns.get_level_values(level):
+            return df.xs(symbol, axis=1, level=level)
+    return None
+
+
+def symbol_frame(df: pd.DataFrame, symbol: str) -> Optional[pd.DataFrame]:
+    """
+    One symbol's rows from a whole (group) yfinance download, or None when
+    the symbol failed: yfinance reports per-symbol errors by leaving its
+    columns missing or entirely NaN rather than raising. Windows are cut
+    from this afterwards, so a window without bars is an empty frame.
+    """
+    frame = split_frame(df, symbol)
+    if frame is None:
+        return None
+    frame = frame.dropna(how="all")
+    return frame if not frame.empty else None
+
+
+# Column names providers return, matching yfinance downloads
+PROVIDER_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def period_days(period: str) -> int:
+    """Calendar days in a yfinance-style "<n>d" period (5 otherwise)"""
+    if period.endswith("d") and period[:-1].isdigit():
+        return int(period[:-1])
+    return 5
+
+
+class MarketDataProvider(ABC):
+    """
+    Source of daily OHLCV bars. Frames are date-indexed with yfinance's
+    Open/High/Low/Close/Volume columns; None means the fetch failed and an
+    empty frame means there is no data for the window.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def download_history(self, windows: List[Window], auto_adjust: bool = True) -> List[FetchResult]:
+        """Daily bars for each (symbol, first date, last date) window"""
+
+    @abstractmethod
+    def download_recent(self, symbols: List[str], period: str = "5d") -> Dict[str, Optional[pd.DataFrame]]:
+        """Latest daily bars per symbol"""
+
+
+class FrameProvider(MarketDataProvider):
+    """Provider backed by whole per-symbol frames that are sliced locally"""
+
+    @abstractmethod
+    def frame(self, symbol: str) -> pd.DataFrame:
+        """Every bar available for symbol (empty when unknown)"""
+
+    def download_history(self, windows: List[Window], auto_adjust: bool = True) -> List[FetchResult]:
+        results: List[FetchResult] = []
+        for symbol, start_date, end_date in windows:
+            frame = self.frame(symbol)
+            results.append((symbol, start_date, end_date,
+                            frame.loc[pd.Timestamp(start_date):pd.Timestamp(end_date)]))
+        return results
+
+    def download_recent(self, symbols: List[str], period: str = "5d") -> Dict[str, Optional[pd.DataFrame]]:
+        recent = {}
+        for symbol in symbols:
+            frame = self.frame(symbol)
+            if not frame.empty:
+                frame = frame.loc[frame.index[-1] - pd.Timedelta(days=period_days(period) - 1):]
+            recent[symbol] = frame
+        return recent
+
+
+class YFinanceProvider(MarketDataProvider):
+    """
+    Yahoo Finance: every caller's symbols and date windows are grouped into
+    as few multi-ticker ``yf.download`` calls as possible and the combined
+    frame is split per symbol once.
+    """
+
+    name = "yfinance"
+
+    def _group_windows(self, windows: List[Window]) -> List[Tuple[date, date, List[Window]]]:
+        """Group windows with nearby edges under one covering download range"""
+        groups: List[Tuple[date, date, List[Window]]] = []
+        for window in sorted(windows, key=lambda w: (w[1], w[2])):
+            _, start_date, end_date = window
+            for i, (group_start, group_end, members) in enumerate(groups):
+                if (abs(start_date - group_start) <= WINDOW_SLACK
+                        and abs(end_date - group_end) <= WINDOW_SLACK):
+                    members.append(window)
+                    groups[i] = (min(group_start, start_date),
+                                 max(group_end, end_date), members)
+                    break
+            else:
+                groups.append((start_date, end_date, [window]))
+        return groups
+
+    def download_history(self, windows: List[Window], auto_adjust: bool = True) -> List[FetchResult]:
+        """Fetch daily bars for every window, one ``yf.download`` per group"""
+        results: List[FetchResult] = []
+        groups = self._group_windows(windows)
+        failures: List[Exception] = []
+
+        for group_start, group_end, members in groups:
+            symbols = sorted({symbol for symbol, _, _ in members})
+            try:
+                df = yf.download(
+                    tickers=symbols,
+                    start=group_start.isoformat(),
+                    # yfinance treats end as exclusive
+                    end=(group_end + timedelta(days=1)).isoformat(),
+                    interval="1d",
+                    group_by="ticker",
+                    auto_adjust=auto_adjust,
+                    progress=False,
+                    threads=True,
+                )
+            except Exception as e:
+                print(f"Error downloading {symbols}: {e}")
+                results.extend((s, a, b, None) for s, a, b in members)
+                failures.append(e)
+                continue
+
+            frames = {symbol: symbol_frame(df, symbol) for symbol in symbols}
+            missing = [symbol for symbol, frame in frames.items() if frame is None]
+            if missing:
+                print(f"Error fetching data for {', '.join(missing)}: no rows returned")
+
+            for symbol, start_date, end_date in members:
+                frame = frames[symbol]
+                if frame is not None and not frame.empty:
+                    index = pd.DatetimeIndex(frame.index)
+                    if index.tz is not None:
+                        index = index.tz_localize(None)
+                    mask = ((index >= pd.Timestamp(start_date))
+                            & (index < pd.Timestamp(end_date + timedelta(days=1))))
+                    frame = frame[mask]
+                results.append((symbol, start_date, end_date, frame))
+
+        if groups and len(failures) == len(groups):
+            # Nothing came back: let the circuit breaker see the error
+            raise failures[-1]
+        return results
+
+    def download_recent(self, symbols: List[str], period: str = "5d") -> Dict[str, Optional[pd.DataFrame]]:
+        """Latest daily bars for several symbols in one ``yf.download``, keyed by symbol"""
+        df = yf.download(
+            tickers=symbols,
+            period=period,
+            interval="1d",
+            group_by="ticker",
+            auto_adjust=False,
+            progress=False,
+            threads=True,
+        )
+        return {symbol: symbol_frame(df, symbol) for symbol in symbols}
+
+
+class FixtureProvider(FrameProvider):
+    """
+    Offline snapshot of daily bars for deterministic runs and load tests.
+
+    ``path`` is either a directory of ``<SYMBOL>.csv`` / ``<SYMBOL>.parquet``
+    files (a date column plus OHLCV columns in any case) or a SQLite file
+    with the app's ``prices`` table. Symbols missing from the snapshot come
+    back as empty frames, like a delisted ticker upstream.
+    """
+
+    name = "fixture"
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._frames: Dict[str, pd.DataFrame] = {}
+
+    @property
+    def is_sqlite(self) -> bool:
+        return self.path.is_file()
+
+    def symbols(self) -> List[str]:
+        """Every symbol the snapshot holds"""
+        if self.is_sqlite:
+            with sqlite3.connect(self.path) as conn:
+                rows = conn.execute("SELECT DISTINCT ticker FROM prices ORDER BY ticker").fetchall()
+            return [row[0] for row in rows]
+        files = list(self.path.glob("*.csv")) + list(self.path.glob("*.parquet"))
+        return sorted({file.stem for file in files})
+
+    def frame(self, symbol: str) -> pd.DataFrame:
+        if symbol not in self._frames:
+            self._frames[symbol] = self._load(symbol)
+        return self._frames[symbol]
+
+    def snapshot_windows(self) -> List[Window]:
+        """One window per symbol covering everything in the snapshot"""
+        windows = []
+        for symbol in self.symbols():
+            frame = self.frame(symbol)
+            if not frame.empty:
+                windows.append((symbol, frame.index[0].date(), frame.index[-1].date()))
+        return windows
+
+    def _load(self, symbol: str) -> pd.DataFrame:
+        if self.is_sqlite:
+            with sqlite3.connect(self.path) as conn:
+                raw = pd.read_sql_query(
+                    "SELECT date, open, high, low, close, volume FROM prices "
+                    "WHERE ticker = ? ORDER BY date",
+                    conn, params=(symbol,))
+        elif (self.path / f"{symbol}.parquet").exists():
+            raw = pd.read_parquet(self.path / f"{symbol}.parquet")
+        elif (self.path / f"{symbol}.csv").exists():
+            raw = pd.read_csv(self.path / f"{symbol}.csv")
+        else:
+            return pd.DataFrame(columns=PROVIDER_COLUMNS, index=pd.DatetimeIndex([]))
+
+        raw = raw.rename(columns=str.capitalize)
+        if "Date" in raw.columns:
+            raw = raw.set_index("Date")
+        index = pd.to_datetime(raw.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        frame = raw.reindex(columns=PROVIDER_COLUMNS).set_axis(index.normalize())
+        return frame[~frame.index.duplicated(keep="last")].sort_index()
+
+
+class SyntheticProvider(FrameProvider):
+    """The deterministic generator behind /prices, cut off at today"""
+
+    name = "synthetic"
+
+    def __init__(self, synthetic: Optional[SyntheticPriceService] = None):
+        self.synthetic = synthetic or SyntheticPriceService()
+
+    def frame(self, symbol: str) -> pd.DataFrame:
+        # Held in the byte-bounded series cache; earlier days' frames age out
+        today = date.today()
+        key = f"provider_frame:{symbol}:{today.isoformat()}"
+        frame = series_cache.get(key)
+        if frame is None:
+            frame = self._build(symbol, today)
+            series_cache.set(key, frame)
+        return frame
+
+    def _build(self, symbol: str, today: date) -> pd.DataFrame:
+        columns = self.synthetic.get_columns(symbol, today.year)
+        index = pd.DatetimeIndex(self.synthetic.get_dates(today.year))
+        frame = pd.DataFrame(
+            {name.capitalize(): np.asarray(columns[name]) for name in columns}, index=index)
+        return frame.loc[:pd.Timestamp(today)]
+
+
+def create_provider(name: Optional[str] = None, fixture_path: Optional[str] = None) -> MarketDataProvider:
+    """Provider picked by MARKET_DATA_PROVIDER (yfinance, fixture or synthetic)"""
+    name = (name or os.getenv("MARKET_DATA_PROVIDER", "yfinance")).lower()
+    if name == "fixture":
+        fixture_path = fixture_path or os.getenv("MARKET_DATA_FIXTURE")
+        if not fixture_path:
+            raise ValueError("MARKET_DATA_FIXTURE must point at the fixture snapshot")
+        return FixtureProvider(fixture_path)
+    if name == "synthetic":
+        return SyntheticProvider()
+    if name == "yfinance":
+        return YFinanceProvider()
+    raise ValueError(f"Unknown market data provider: {name}")
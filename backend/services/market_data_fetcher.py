@@ -0,0 +1,108 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from services.market_data import FetchResult, MarketDataProvider, Window, create_provider
+from services.upstream_guard import UpstreamGuard, WorkersBusyError, history_guard, quotes_guard
+
+
+# Threads reserved for upstream calls; a call that timed out keeps its
+# thread until the provider returns, so this also caps stuck downloads
+UPSTREAM_MAX_WORKERS = int(os.getenv("UPSTREAM_MAX_WORKERS", "4"))
+
+
+class MarketDataFetcher:
+    """
+    Shared upstream fetch layer: runs the configured market-data provider
+    on its own bounded executor behind per-endpoint timeouts and circuit
+    breakers. Calls are refused, not queued, while every worker is busy.
+    """
+
+    def __init__(self, provider: Optional[MarketDataProvider] = None, max_workers: int = UPSTREAM_MAX_WORKERS, history_guard: UpstreamGuard = history_guard, quotes_guard: UpstreamGuard = quotes_guard):
+        # Resolved on first use so MARKET_DATA_PROVIDER can come from .env
+        self._provider = provider
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="market-data")
+        # Worker threads still running, including calls whose caller timed out
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self.saturated = 0
+        # Timeouts and circuit breakers per kind of upstream call
+        self.history_guard = history_guard
+        self.quotes_guard = quotes_guard
+
+    @property
+    def provider(self) -> MarketDataProvider:
+        if self._provider is None:
+            self._provider = create_provider()
+            print(f"📡 Market data provider: {self._provider.name}")
+        return self._provider
+
+    def _submit(self, fn: Callable[..., Any], *args: Any) -> "asyncio.Future[Any]":
+        """
+        Run fn on the upstream executor. Raises WorkersBusyError instead of
+        queueing behind stuck calls when every worker is occupied.
+        """
+        with self._lock:
+            if self._in_flight >= self.max_workers:
+                self.saturated += 1
+                raise WorkersBusyError(
+                    f"all {self.max_workers} upstream workers are busy")
+            self._in_flight += 1
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(self._release)
+        return asyncio.wrap_future(future)
+
+    def _release(self, _future: Future):
+        with self._lock:
+            self._in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "in_flight": self._in_flight,
+            "saturated": self.saturated,
+        }
+
+    async def fetch_recent(self, symbols: List[str], period: str = "5d") -> Dict[str, Optional[pd.DataFrame]]:
+        """
+        Async wrapper for the provider's download_recent on the shared
+        upstream executor. Raises UpstreamUnavailable on timeout or while the circuit is open.
+        """
+        return await self.quotes_guard.call(
+            lambda: self._submit(
+                self.provider.download_recent, list(dict.fromkeys(symbols)), period),
+            failed=lambda frames: all(f is None or f.empty for f in frames.values()))
+
+    async def fetch_history(self, windows: List[Window], auto_adjust: bool = True) -> List[FetchResult]:
+        """
+        Async wrapper running the batched download off the event loop. When
+        upstream is failing or slow every window comes back as None (the
+        same as a download error) without waiting out a full request.
+        """
+        if not windows:
+            return []
+        try:
+            return await self.history_guard.call(
+                lambda: self._submit(self.provider.download_history, windows, auto_adjust),
+                # yfinance reports outages and rate limits as missing data, not errors
+                failed=lambda results: all(frame is None for *_, frame in results))
+        except Exception as e:
+            print(f"⚠️ Serving stored data only, upstream unavailable: {e}")
+            return [(symbol, start_date, end_date, None) for symbol, start_date, end_date in windows]
+
+    async def fetch_frames(self, symbols: List[str], start_date: date, end_date: date, auto_adjust: bool = True) -> Dict[str, Optional[pd.DataFrame]]:
+        """Fetch one shared window for several symbols, keyed by symbol"""
+        windows = [(symbol, start_date, end_date) for symbol in dict.fromkeys(symbols)]
+        results = await self.fetch_history(windows, auto_adjust)
+        return {symbol: frame for symbol, _, _, frame in results}
+
+
+# Process-wide fetcher so concurrent services share one upstream executor
+market_data_fetcher = MarketDataFetcher()
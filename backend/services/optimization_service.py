@@ -1,39 +1,259 @@
+import asyncio
+import os
 import numpy as np
+import pandas as pd
 from scipy.optimize import minimize
-from typing import Dict, List, Any
-from models import OptimizationRequest, OptimizationResponse
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Tuple, Union
+
+from database import Database
+from models import OptimizationRequest, OptimizationResponse, WeightBounds
+from services.payload_cache import PayloadCache, canonical_key
+from services.price_service import PriceService
+
+
+RISK_FREE_RATE = 0.02
+TRADING_DAYS = 252
+
+# Long-run expected returns, and the risk model when no history is available
+ASSET_CHARACTERISTICS = {
+    "VTI": {"return": 0.08, "volatility": 0.15},
+    "QQQ": {"return": 0.12, "volatility": 0.20},
+    "BND": {"return": 0.04, "volatility": 0.05},
+    "GLD": {"return": 0.06, "volatility": 0.12},
+    "VNQ": {"return": 0.07, "volatility": 0.18},
+    "BITO": {"return": 0.15, "volatility": 0.35},
+}
+
+# Pairwise correlation assumed by the characteristics-based risk model
+FALLBACK_CORRELATION = 0.3
+# Fewer overlapping daily returns than this and the sample covariance is not used
+MIN_HISTORY_DAYS = 60
+FRONTIER_POINTS = 25
+# Slack allowed when checking a closed-form solution against weight bounds
+BOUND_TOLERANCE = 1e-9
+# Batches needing at least this many new frontiers solve them on a process pool
+PROCESS_POOL_THRESHOLD = int(os.getenv("OPTIMIZER_PROCESS_POOL_THRESHOLD", "8"))
+
+_UNSOLVED = object()
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+# Efficient frontiers per (universe, lookback, shrinkage, weight caps)
+frontier_cache = PayloadCache(
+    "efficient_frontiers", max_entries=128, max_bytes=16 * 1024 * 1024,
+    ttl=timedelta(hours=12))
+
+
+def frontier_process_pool() -> ProcessPoolExecutor:
+    """Lazily started pool for CPU-bound frontier solves (spawned, not forked)"""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=os.cpu_count(), mp_context=get_context("spawn"))
+    return _process_pool
+
+
+def discard_frontier_process_pool(pool: ProcessPoolExecutor):
+    """Drop a broken pool so the next batch starts a fresh one"""
+    global _process_pool
+    if _process_pool is pool:
+        _process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shrinkage_intensity(returns: np.ndarray) -> float:
+    """Ledoit-Wolf optimal weight on the diagonal target for (days, assets) returns"""
+    n_days = returns.shape[0]
+    centered = returns - returns.mean(axis=0)
+    sample = centered.T @ centered / n_days
+    squared = centered ** 2
+    # Estimated variance of each sample covariance entry
+    pi = (squared.T @ squared / n_days - sample ** 2) / n_days
+
+    off_diagonal = ~np.eye(sample.shape[0], dtype=bool)
+    denominator = (sample[off_diagonal] ** 2).sum()
+    if denominator <= 0:
+        return 1.0
+    return float(np.clip(pi[off_diagonal].sum() / denominator, 0.0, 1.0))
+
+
+def estimate_covariance(returns: np.ndarray, shrinkage: Optional[float] = None) -> np.ndarray:
+    """
+    Annualized covariance of daily returns, shrunk toward its diagonal.
+
+    ``shrinkage`` is the weight on the diagonal target; the Ledoit-Wolf
+    intensity is used when it is None.
+    """
+    sample = np.cov(returns, rowvar=False, bias=True).reshape(
+        returns.shape[1], returns.shape[1])
+    delta = shrinkage_intensity(returns) if shrinkage is None else shrinkage
+    shrunk = (1 - delta) * sample + delta * np.diag(np.diag(sample))
+    return shrunk * TRADING_DAYS
+
+
+def fallback_covariance(volatilities: np.ndarray) -> np.ndarray:
+    """Full covariance from volatilities and one constant correlation"""
+    correlation = np.full((len(volatilities),) * 2, FALLBACK_CORRELATION)
+    np.fill_diagonal(correlation, 1.0)
+    return correlation * np.outer(volatilities, volatilities)
+
+
+def closed_form_inputs(mu: np.ndarray, cov: np.ndarray, risk_free_rate: float) -> Optional[Dict[str, Any]]:
+    """
+    Unconstrained (budget-only) solutions: minimum variance, tangency and
+    the two-fund terms for any target return. None when cov is singular.
+    """
+    try:
+        inv_ones, inv_mu = np.linalg.solve(cov, np.column_stack([np.ones_like(mu), mu])).T
+    except np.linalg.LinAlgError:
+        return None
+
+    a, b, c = inv_ones.sum(), inv_mu.sum(), mu @ inv_mu
+    inv_excess = inv_mu - risk_free_rate * inv_ones
+    return {
+        "inv_ones": inv_ones,
+        "inv_mu": inv_mu,
+        "a": a, "b": b, "c": c, "d": a * c - b * b,
+        "min_variance": inv_ones / a if a > 0 else None,
+        # Only a maximum-Sharpe point when excess returns sum positive
+        "tangency": inv_excess / inv_excess.sum() if inv_excess.sum() > 0 else None,
+    }
+
+
+def two_fund_weights(closed: Dict[str, Any], target: float) -> Optional[np.ndarray]:
+    """Budget-only minimum-variance weights at a target return"""
+    if closed["d"] <= 0:
+        return None
+    a, b, c, d = closed["a"], closed["b"], closed["c"], closed["d"]
+    return ((c - target * b) * closed["inv_ones"] + (target * a - b) * closed["inv_mu"]) / d
+
+
+def max_return_weights(mu: np.ndarray, caps: np.ndarray, floors: Optional[np.ndarray] = None) -> np.ndarray:
+    """Highest-return long-only portfolio under per-asset min/max weights (greedy fill)"""
+    weights = np.zeros_like(mu) if floors is None else floors.astype(float)
+    remaining = 1.0 - weights.sum()
+    for i in np.argsort(-mu):
+        if remaining <= 0:
+            break
+        extra = min(caps[i] - weights[i], remaining)
+        weights[i] += extra
+        remaining -= extra
+    return weights
+
+
+def build_frontier(mu: np.ndarray, cov: np.ndarray, caps: np.ndarray, seed: Optional[Dict[str, Any]] = None, risk_free_rate: float = RISK_FREE_RATE, floors: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """
+    Long-only efficient frontier from the minimum-variance to the
+    maximum-return portfolio, with the tangency portfolio included.
+
+    Points use the closed-form solution whenever it already satisfies
+    the weight bounds (``floors`` to ``caps``); the rest are SLSQP solves
+    with analytic gradients, warm-started from the nearest point of
+    ``seed`` (a frontier already solved for the same inputs) or the
+    previous point.
+    """
+    floors = np.zeros_like(caps) if floors is None else floors
+    bounds = list(zip(floors, caps))
+    budget = {"type": "eq", "fun": lambda w: np.sum(w) - 1,
+              "jac": lambda w: np.ones_like(w)}
+    # Floors plus the rest of the budget spread in proportion to the headroom
+    room = caps - floors
+    x0 = floors + (1 - floors.sum()) * room / room.sum() if room.sum() > 0 else floors
+    closed = closed_form_inputs(mu, cov, risk_free_rate)
+
+    def feasible(w):
+        return (w is not None and np.all(w >= floors - BOUND_TOLERANCE)
+                and np.all(w <= caps + BOUND_TOLERANCE))
+
+    def nearest_seed(target, fallback):
+        if seed is None:
+            return fallback
+        return np.clip(
+            seed["weights"][np.abs(seed["returns"] - target).argmin()], floors, caps)
+
+    def variance(w):
+        return w @ cov @ w
+
+    def variance_grad(w):
+        return 2 * cov @ w
+
+    def negative_sharpe(w):
+        volatility = np.sqrt(w @ cov @ w)
+        if volatility == 0:
+            return -1000
+        return -(w @ mu - risk_free_rate) / volatility
+
+    def negative_sharpe_grad(w):
+        cov_w = cov @ w
+        volatility = np.sqrt(w @ cov_w)
+        if volatility == 0:
+            return np.zeros_like(w)
+        excess = w @ mu - risk_free_rate
+        return -(mu * volatility - excess * cov_w / volatility) / volatility ** 2
+
+    def solve(objective, gradient, start, constraints):
+        result = minimize(objective, start, jac=gradient, method="SLSQP",
+                          bounds=bounds, constraints=constraints)
+        return result.x if result.success else start
+
+    min_var = closed and closed["min_variance"]
+    if not feasible(min_var):
+        start = nearest_seed(seed["min_variance_return"], x0) if seed else x0
+        min_var = solve(variance, variance_grad, start, [budget])
+    tangency = closed and closed["tangency"]
+    if not feasible(tangency):
+        start = nearest_seed(seed["tangency_return"], x0) if seed else x0
+        tangency = solve(negative_sharpe, negative_sharpe_grad, start, [budget])
+    max_ret = max_return_weights(mu, caps, floors)
+
+    points = [min_var]
+    low, high = min_var @ mu, max_ret @ mu
+    if high > low:
+        previous = min_var
+        for target in np.linspace(low, high, FRONTIER_POINTS)[1:-1]:
+            weights = two_fund_weights(closed, target) if closed else None
+            if not feasible(weights):
+                on_target = {"type": "eq", "fun": lambda w, t=target: w @ mu - t,
+                             "jac": lambda w: mu}
+                weights = solve(variance, variance_grad,
+                                nearest_seed(target, previous), [budget, on_target])
+            points.append(weights)
+            previous = weights
+        points.append(max_ret)
+    points.append(tangency)
+
+    weights = np.clip(np.array(points), 0.0, None)
+    weights /= weights.sum(axis=1, keepdims=True)
+    order = np.argsort(weights @ mu, kind="stable")
+    weights = weights[order]
+    returns = weights @ mu
+    volatilities = np.sqrt(np.einsum("ki,ij,kj->k", weights, cov, weights))
+
+    return {
+        "mu": mu,
+        "cov": cov,
+        "weights": weights,
+        "returns": returns,
+        "volatilities": volatilities,
+        "min_variance_return": float(min_var @ mu),
+        "tangency_return": float(np.clip(tangency @ mu, returns[0], returns[-1])),
+    }
 
 
 class OptimizationService:
-    def __init__(self):
-        self.risk_free_rate = 0.02
-
-    async def optimize(self, request: OptimizationRequest) -> OptimizationResponse:
-        """Optimize portfolio using Sharpe ratio"""
-
-        # Mock asset characteristics
-        asset_characteristics = {
-            "VTI": {"return": 0.08, "volatility": 0.15},
-            "QQQ": {"return": 0.12, "volatility": 0.20},
-            "BND": {"return": 0.04, "volatility": 0.05},
-            "GLD": {"return": 0.06, "volatility": 0.12},
-            "VNQ": {"return": 0.07, "volatility": 0.18},
-            "BITO": {"return": 0.15, "volatility": 0.35},
-        }
-
-        # Get available assets with characteristics
-        available_assets = []
-        returns = []
-        cov_matrix = []
-
-        for asset in request.available_assets:
-            if asset in asset_characteristics:
-                available_assets.append(asset)
-                char = asset_characteristics[asset]
-                returns.append(char["return"])
-                cov_matrix.append([char["volatility"] ** 2])
-
-        if not available_assets:
+    def __init__(self, price_service: Optional[PriceService] = None):
+        self.risk_free_rate = RISK_FREE_RATE
+        self.price_service = price_service or PriceService()
+
+    async def optimize(self, request: OptimizationRequest, db: Optional[Database] = None) -> OptimizationResponse:
+        """Pick the frontier portfolio matching the request's risk tolerance or target return"""
+        return self._respond(await self.get_frontier(request, db), request)
+
+    def _respond(self, frontier: Optional[Dict[str, Any]], request: OptimizationRequest) -> OptimizationResponse:
+        if frontier is None:
             # Return default allocation
             return OptimizationResponse(
                 optimal_weights={"VTI": 0.6, "BND": 0.4},
@@ -44,69 +264,222 @@ class OptimizationService:
                 recommendations=["Consider diversifying your portfolio"]
             )
 
-        # Convert to numpy arrays
-        returns = np.array(returns)
-        cov_matrix = np.array(cov_matrix)
+        weights = self._select_weights(
+            frontier, request.risk_tolerance, request.target_return)
+        return self._build_response(frontier, weights)
 
-        # Simple optimization: maximize Sharpe ratio
-        def negative_sharpe(weights):
-            portfolio_return = np.dot(weights, returns)
-            portfolio_volatility = np.sqrt(
-                np.dot(weights.T, np.dot(cov_matrix, weights)))
-            if portfolio_volatility == 0:
-                return -1000
-            sharpe = (portfolio_return - self.risk_free_rate) / \
-                portfolio_volatility
-            return -sharpe
+    async def optimize_batch(self, requests: List[OptimizationRequest], db: Optional[Database] = None) -> List[OptimizationResponse]:
+        """
+        Answer many requests at once: each distinct frontier is built once,
+        price history is loaded once per lookback window, and large sets of
+        missing frontiers are solved in parallel on a process pool.
+        """
+        keys = [self._frontier_key(r, r.constraints or {}) for r in requests]
+        frontiers = {}
+        missing: Dict[str, OptimizationRequest] = {}
+        for key, request in zip(keys, requests):
+            if key in frontiers or key in missing:
+                continue
+            frontier = frontier_cache.get(key, _UNSOLVED)
+            if frontier is _UNSOLVED:
+                missing[key] = request
+            else:
+                frontiers[key] = frontier
 
-        # Constraints: weights sum to 1
-        constraints = {'type': 'eq', 'fun': lambda x: np.sum(x) - 1}
+        # One history load per lookback window covering every missing universe
+        closes = {}
+        for lookback_days in {r.lookback_days for r in missing.values()}:
+            symbols = [s for r in missing.values() if r.lookback_days == lookback_days
+                       for s in r.available_assets]
+            closes[lookback_days] = await self._load_closes(symbols, lookback_days, db)
 
-        # Bounds: weights between 0 and 1
-        bounds = [(0, 1) for _ in available_assets]
+        jobs = []
+        for key, request in missing.items():
+            inputs = self._frontier_inputs(request, closes[request.lookback_days])
+            if inputs is None:
+                frontiers[key] = None
+                frontier_cache.set(key, None)
+            else:
+                jobs.append((key, *inputs))
 
-        # Initial guess: equal weights
-        x0 = np.array([1.0 / len(available_assets) for _ in available_assets])
+        solved = await self._solve_frontiers([args for _, args, _ in jobs])
+        for (key, _, meta), frontier in zip(jobs, solved):
+            frontier.update(meta)
+            frontiers[key] = frontier
+            frontier_cache.set(key, frontier)
 
-        # Optimize
-        result = minimize(negative_sharpe, x0, method='SLSQP',
-                          bounds=bounds, constraints=constraints)
+        return [
+            self._respond(frontiers[key], request)
+            for key, request in zip(keys, requests)
+        ]
 
-        if result.success:
-            optimal_weights = {asset: weight for asset,
-                               weight in zip(available_assets, result.x)}
-            portfolio_return = np.dot(result.x, returns)
-            portfolio_volatility = np.sqrt(
-                np.dot(result.x.T, np.dot(cov_matrix, result.x)))
-            sharpe_ratio = (portfolio_return - self.risk_free_rate) / \
-                portfolio_volatility if portfolio_volatility > 0 else 0
+    async def _solve_frontiers(self, jobs: List[tuple]) -> List[Dict[str, Any]]:
+        """
+        build_frontier for each argument tuple; large sets go to the process
+        pool, falling back to threads (with a fresh pool next time) if a
+        worker process died.
+        """
+        loop = asyncio.get_event_loop()
+        if len(jobs) >= PROCESS_POOL_THRESHOLD:
+            pool = frontier_process_pool()
+            try:
+                return await asyncio.gather(*(
+                    loop.run_in_executor(pool, build_frontier, *args) for args in jobs))
+            except BrokenProcessPool as e:
+                print(f"⚠️ Frontier process pool broke, solving in-process: {e}")
+                discard_frontier_process_pool(pool)
+        return await asyncio.gather(*(
+            loop.run_in_executor(None, build_frontier, *args) for args in jobs))
 
-            return OptimizationResponse(
-                optimal_weights=optimal_weights,
-                expected_return=portfolio_return,
-                expected_volatility=portfolio_volatility,
-                sharpe_ratio=sharpe_ratio,
-                risk_contribution=optimal_weights,
-                recommendations=[
-                    f"Optimal allocation found with {len(available_assets)} assets",
-                    f"Expected return: {portfolio_return:.1%}",
-                    f"Expected volatility: {portfolio_volatility:.1%}",
-                    f"Sharpe ratio: {sharpe_ratio:.2f}"
-                ]
-            )
+    async def get_frontier(self, request: OptimizationRequest, db: Optional[Database] = None) -> Optional[Dict[str, Any]]:
+        """Cached efficient frontier for the request's universe and risk model settings"""
+        key = self._frontier_key(request, request.constraints or {})
+
+        async def compute():
+            closes = await self._load_closes(
+                request.available_assets, request.lookback_days, db)
+            inputs = self._frontier_inputs(request, closes)
+            if inputs is None:
+                return None
+            args, meta = inputs
+            loop = asyncio.get_event_loop()
+            frontier = await loop.run_in_executor(None, build_frontier, *args)
+            frontier.update(meta)
+            return frontier
+
+        frontier, _ = await frontier_cache.get_or_compute(key, compute)
+        return frontier
+
+    def _frontier_key(self, request: OptimizationRequest, constraints: Dict[str, Union[float, WeightBounds]]) -> str:
+        return canonical_key(
+            "frontier",
+            assets=request.available_assets,
+            lookback_days=request.lookback_days,
+            shrinkage=request.shrinkage,
+            constraints=constraints,
+        )
+
+    def _frontier_inputs(self, request: OptimizationRequest, closes: Optional[pd.DataFrame]) -> Optional[Tuple[tuple, Dict[str, Any]]]:
+        """(build_frontier args, metadata) for a request, or None without usable assets"""
+        mu, cov, assets, source = self._estimate_inputs(
+            request.available_assets, closes, request.shrinkage)
+        if not assets:
+            return None
+        floors, caps = self._weight_bounds(assets, request.constraints)
+        # A bounded frontier starts from the unbounded one when it is already solved
+        seed = frontier_cache.get(self._frontier_key(request, {})) \
+            if request.constraints else None
+        if seed is not None and seed["assets"] != assets:
+            seed = None
+        return (mu, cov, caps, seed, self.risk_free_rate, floors), {"assets": assets, "source": source}
+
+    def _estimate_inputs(self, symbols: List[str], closes: Optional[pd.DataFrame], shrinkage: Optional[float]):
+        """Expected returns and covariance from stored history, else from characteristics"""
+        symbols = list(dict.fromkeys(symbols))
+        available = [s for s in symbols if closes is not None and s in closes]
+        # Days where any asset did not trade are dropped so returns line up
+        returns = closes[available].dropna().pct_change().iloc[1:] if available else None
+
+        assets = [s for s in symbols
+                  if s in ASSET_CHARACTERISTICS or s in available]
+        if not assets:
+            return None, None, [], None
+
+        mu = np.array([
+            ASSET_CHARACTERISTICS[a]["return"] if a in ASSET_CHARACTERISTICS
+            else returns[a].mean() * TRADING_DAYS
+            for a in assets])
+
+        if len(available) == len(assets) and len(returns) >= MIN_HISTORY_DAYS:
+            cov = estimate_covariance(returns[assets].to_numpy(), shrinkage)
+            return mu, cov, assets, f"{len(returns)} days of price history"
+
+        known = [a for a in assets if a in ASSET_CHARACTERISTICS]
+        if len(known) < len(assets):
+            # Without a full history window only the characteristics universe is usable
+            assets = known
+            mu = np.array([ASSET_CHARACTERISTICS[a]["return"] for a in assets])
+        vols = np.array([ASSET_CHARACTERISTICS[a]["volatility"] for a in assets])
+        return mu, fallback_covariance(vols), assets, "long-run asset characteristics"
+
+    async def _load_closes(self, symbols: List[str], lookback_days: int, db: Optional[Database] = None) -> Optional[pd.DataFrame]:
+        """Daily closes over the lookback window, one column per symbol"""
+        end_date = datetime.now().date()
+        try:
+            frames = await self.price_service.get_frames(
+                list(dict.fromkeys(symbols)), end_date - timedelta(days=lookback_days), end_date, db)
+        except Exception as e:
+            print(f"Error loading price history for optimization: {e}")
+            return None
+
+        closes = pd.DataFrame({
+            symbol: frame["close"].where(frame["close"] > 0)
+            for symbol, frame in frames.items()
+            if frame is not None and not frame.empty
+        })
+        return None if closes.empty else closes
+
+    def _weight_bounds(self, assets: List[str], constraints: Optional[Dict[str, Union[float, WeightBounds]]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Per-asset minimum and maximum weights. A plain number is a maximum;
+        caps that cannot sum to 1 are ignored (the minimums are validated
+        on the request).
+        """
+        floors, caps = [], []
+        for asset in assets:
+            bound = (constraints or {}).get(asset, 1.0)
+            if isinstance(bound, WeightBounds):
+                floors.append(bound.min)
+                caps.append(bound.max)
+            else:
+                floors.append(0.0)
+                caps.append(min(max(bound, 0.0), 1.0))
+        floors, caps = np.array(floors), np.array(caps)
+        return floors, (caps if caps.sum() >= 1 else np.ones(len(assets)))
+
+    def _select_weights(self, frontier: Dict[str, Any], risk_tolerance: float, target_return: Optional[float] = None) -> np.ndarray:
+        """
+        Interpolate frontier weights at a target return: risk tolerance 0
+        is minimum variance, 0.5 the tangency portfolio and 1 maximum return.
+        """
+        returns = frontier["returns"]
+        if target_return is not None:
+            target = target_return
+        elif risk_tolerance <= 0.5:
+            low, high = frontier["min_variance_return"], frontier["tangency_return"]
+            target = low + (high - low) * risk_tolerance / 0.5
         else:
-            # Fallback to equal weights
-            equal_weights = {
-                asset: 1.0 / len(available_assets) for asset in available_assets}
-            portfolio_return = np.mean(returns)
-            portfolio_volatility = np.mean(
-                [char["volatility"] for char in asset_characteristics.values()])
+            low, high = frontier["tangency_return"], returns[-1]
+            target = low + (high - low) * (risk_tolerance - 0.5) / 0.5
 
-            return OptimizationResponse(
-                optimal_weights=equal_weights,
-                expected_return=portfolio_return,
-                expected_volatility=portfolio_volatility,
-                sharpe_ratio=0.5,
-                risk_contribution=equal_weights,
-                recommendations=["Using equal weight allocation as fallback"]
-            )
+        target = float(np.clip(target, returns[0], returns[-1]))
+        weights = np.array([
+            np.interp(target, returns, column) for column in frontier["weights"].T])
+        return weights / weights.sum()
+
+    def _build_response(self, frontier: Dict[str, Any], weights: np.ndarray) -> OptimizationResponse:
+        assets, mu, cov = frontier["assets"], frontier["mu"], frontier["cov"]
+        portfolio_return = float(weights @ mu)
+        portfolio_variance = float(weights @ cov @ weights)
+        portfolio_volatility = np.sqrt(portfolio_variance)
+        sharpe_ratio = (portfolio_return - self.risk_free_rate) / \
+            portfolio_volatility if portfolio_volatility > 0 else 0
+
+        # Share of portfolio variance contributed by each asset
+        contribution = weights * (cov @ weights) / portfolio_variance \
+            if portfolio_variance > 0 else weights
+
+        return OptimizationResponse(
+            optimal_weights=dict(zip(assets, weights.tolist())),
+            expected_return=portfolio_return,
+            expected_volatility=portfolio_volatility,
+            sharpe_ratio=sharpe_ratio,
+            risk_contribution=dict(zip(assets, contribution.tolist())),
+            recommendations=[
+                f"Optimal allocation found with {len(assets)} assets",
+                f"Expected return: {portfolio_return:.1%}",
+                f"Expected volatility: {portfolio_volatility:.1%}",
+                f"Sharpe ratio: {sharpe_ratio:.2f}",
+                f"Risk model: {frontier['source']}"
+            ]
+        )
@@ -0,0 +1,260 @@
+import asyncio
+import inspect
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple, Union
+
+import numpy as np
+
+
+_MISSING = object()
+
+# Lists longer than this are sized from a sample of their first elements
+_SIZE_SAMPLE = 16
+
+
+def canonical_key(namespace: str, **parts: Any) -> str:
+    """
+    Build a cache key that does not depend on argument order.
+
+    List/set values are treated as unordered sets and dicts are sorted by
+    key; comma-separated ``tickers``/``assets`` strings are split first, so
+    "VTI,BND" and "BND,VTI" share one entry.
+    """
+    fields = []
+    for name in sorted(parts):
+        value = parts[name]
+        if name in ("tickers", "assets") and isinstance(value, str):
+            value = [v.strip() for v in value.split(",") if v.strip()]
+        if isinstance(value, dict):
+            value = ",".join(f"{k}={value[k]}" for k in sorted(value))
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            value = ",".join(sorted(str(v) for v in set(value)))
+        fields.append(f"{name}={value}")
+    return f"{namespace}:" + "|".join(fields)
+
+
+def estimate_size(obj: Any) -> int:
+    """Approximate deep size in bytes of a JSON-like payload"""
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(
+            estimate_size(k) + estimate_size(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        size = sys.getsizeof(obj)
+        if not obj:
+            return size
+        if len(obj) <= _SIZE_SAMPLE:
+            return size + sum(estimate_size(v) for v in obj)
+        sample = sum(estimate_size(v) for v in obj[:_SIZE_SAMPLE])
+        return size + sample * len(obj) // _SIZE_SAMPLE
+    return sys.getsizeof(obj)
+
+
+class PayloadCache:
+    """
+    Bounded in-memory LRU cache for generated API payloads.
+
+    Entries are limited by count and by approximate byte size, expire after
+    ``ttl`` and concurrent misses for the same key share one computation.
+    Entries stored with a ``stale_ttl`` can be served by get_or_compute for
+    that long after expiring while one background refresh replaces them.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 128,
+        max_bytes: int = 128 * 1024 * 1024,
+        ttl: Optional[timedelta] = timedelta(hours=1),
+        sizeof: Callable[[Any], int] = estimate_size,
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl.total_seconds() if ttl else None
+        self.sizeof = sizeof
+
+        # key -> (value, size, expires_at, stale_until)
+        self._entries: "OrderedDict[str, Tuple[Any, int, Optional[float], Optional[float]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._revalidations: Set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.stale_served = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return a live entry and mark it most recently used"""
+        value, stale = self._lookup(key)
+        return default if value is _MISSING or stale else value
+
+    def _lookup(self, key: str) -> Tuple[Any, bool]:
+        """(value, stale) for key; _MISSING when absent or past its stale window"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return _MISSING, False
+            value, size, expires_at, stale_until = entry
+            now = time.monotonic()
+            if expires_at is not None and now >= expires_at:
+                self.misses += 1
+                if stale_until is not None and now < stale_until:
+                    return value, True
+                self._remove(key)
+                self.expirations += 1
+                return _MISSING, False
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value, False
+
+    def set(self, key: str, value: Any, ttl: Optional[timedelta] = None, stale_ttl: Optional[timedelta] = None) -> bool:
+        """Store a value, evicting least recently used entries to fit"""
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            with self._lock:
+                self.rejected += 1
+            return False
+
+        seconds = ttl.total_seconds() if ttl else self.ttl
+        expires_at = time.monotonic() + seconds if seconds else None
+        stale_until = expires_at + stale_ttl.total_seconds() if expires_at and stale_ttl else None
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at, stale_until)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def invalidate(self, key: Optional[str] = None):
+        """Drop one entry, or everything when no key is given"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._bytes = 0
+            elif key in self._entries:
+                self._remove(key)
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Union[Any, Awaitable[Any]]],
+        ttl: Optional[timedelta] = None,
+        stale_ttl: Optional[timedelta] = None,
+    ) -> Tuple[Any, bool]:
+        """
+        Return ``(value, cached)`` for key, computing it on a miss.
+
+        ``compute`` may be async or a plain callable; plain callables run on
+        the default executor so a miss never blocks the event loop. While
+        one caller computes a key, other callers for the same key await
+        that result instead of starting their own computation. An
+        expired entry still inside its ``stale_ttl`` window is returned
+        immediately and refreshed in the background.
+        """
+        value, stale = self._lookup(key)
+        if value is not _MISSING:
+            if stale:
+                self._revalidate(key, compute, ttl, stale_ttl)
+            return value, True
+
+        with self._lock:
+            pending = self._inflight.get(key)
+            if pending is None:
+                future = asyncio.get_running_loop().create_future()
+                self._inflight[key] = future
+            else:
+                self.coalesced += 1
+
+        if pending is not None:
+            return await asyncio.shield(pending), True
+
+        return await self._compute(key, compute, ttl, stale_ttl, future), False
+
+    async def _compute(self, key: str, compute: Callable[[], Union[Any, Awaitable[Any]]], ttl: Optional[timedelta], stale_ttl: Optional[timedelta], future: asyncio.Future) -> Any:
+        try:
+            if inspect.iscoroutinefunction(compute):
+                value = await compute()
+            else:
+                # Synchronous builders run off the event loop
+                value = await asyncio.get_running_loop().run_in_executor(None, compute)
+                if inspect.isawaitable(value):
+                    value = await value
+            self.set(key, value, ttl, stale_ttl)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _revalidate(self, key: str, compute: Callable[[], Union[Any, Awaitable[Any]]], ttl: Optional[timedelta], stale_ttl: Optional[timedelta]):
+        """Start one background refresh for a stale key; the stale value stays on failure"""
+        with self._lock:
+            self.stale_served += 1
+            if key in self._inflight:
+                return
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[key] = future
+
+        async def refresh():
+            try:
+                await self._compute(key, compute, ttl, stale_ttl, future)
+            except Exception as e:
+                print(f"⚠️ {self.name}: background refresh failed, keeping stale entry: {e}")
+
+        task = asyncio.create_task(refresh())
+        self._revalidations.add(task)
+        task.add_done_callback(self._revalidations.discard)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "coalesced": self.coalesced,
+                "rejected": self.rejected,
+                "stale_served": self.stale_served,
+                "inflight": len(self._inflight),
+            }
+
+    def keys(self) -> Iterable[str]:
+        with self._lock:
+            return list(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str):
+        _, size, _, _ = self._entries.pop(key)
+        self._bytes -= size
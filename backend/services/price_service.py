@@ -1,221 +1,290 @@
-import yfinance as yf
+import asyncio
 import pandas as pd
 import sqlite3
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
-import numpy as np
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+from database import Database
+from services.price_store import PriceStore, TRAILING_BARS, price_store
+from services.market_data import FixtureProvider
+from services.market_data_fetcher import MarketDataFetcher, FetchResult, market_data_fetcher
+
+
+PERIOD_DAYS = {
+    "1mo": 30,
+    "3mo": 90,
+    "6mo": 182,
+    "1y": 365,
+    "2y": 730,
+    "5y": 1825,
+    "10y": 3650,
+}
+
+# How often the trailing bars of a ticker are refreshed
+REFRESH_INTERVAL = timedelta(hours=1)
+
+# Gap fills in progress, keyed by ticker (one future per batched download,
+# resolved with the tickers whose download failed)
+_gap_fills: Dict[str, "asyncio.Future[Set[str]]"] = {}
+
+# Tickers offered in the game
+AVAILABLE_TICKERS = [
+    # Stocks & ETFs
+    "VTI",  # Total Stock Market
+    "QQQ",  # Nasdaq 100
+    "SPY",  # S&P 500
+    "VEA",  # Developed Markets
+    "VWO",  # Emerging Markets
+
+    # Bonds
+    "BND",  # Total Bond Market
+    "TLT",  # 20+ Year Treasury
+    "IEF",  # 7-10 Year Treasury
+    "SHY",  # 1-3 Year Treasury
+
+    # Commodities
+    "GLD",  # Gold
+    "SLV",  # Silver
+    "DJP",  # Commodity Index
+
+    # REITs
+    "VNQ",  # Real Estate
+    "IYR",  # Real Estate
+    "SCHH",  # Real Estate
+
+    # Crypto (through ETFs)
+    "BITO",  # Bitcoin Strategy
+    "ETHE",  # Ethereum Strategy
+]
+
+
+def normalize_tickers(tickers: str) -> List[str]:
+    """Split, upper-case and de-duplicate a comma-separated ticker list"""
+    return list(dict.fromkeys(
+        t.strip().upper() for t in tickers.split(",") if t.strip()))
 
 
 class PriceService:
-    def __init__(self):
-        self.executor = ThreadPoolExecutor(max_workers=4)
-
-    def _safe_float(self, value):
-        """Convert value to safe float for JSON serialization"""
-        if pd.isna(value) or np.isnan(value) or np.isinf(value):
-            return 0.0
-        return float(value)
+    def __init__(self, store: Optional[PriceStore] = None, fetcher: Optional[MarketDataFetcher] = None):
+        self.fetcher = fetcher or market_data_fetcher
+        self.store = store or price_store
 
-    async def get_prices(self, tickers: List[str], period: str = "1y", db: sqlite3.Connection = None) -> Dict[str, Any]:
-        """Get historical prices with caching"""
-        # Check cache first
-        cached_data = await self._get_cached_prices(tickers, period, db)
-        if cached_data:
-            return cached_data
+    async def get_prices(self, tickers: List[str], period: str = "1y", db: Optional[Database] = None) -> Dict[str, Any]:
+        """Get historical prices, fetching only the date ranges missing from the store"""
+        start_date, end_date = self._period_range(period)
+        frames, fetched = await self._load_frames(tickers, start_date, end_date, db)
 
-        # Fetch from yfinance
-        price_data = await self._fetch_prices(tickers, period)
-
-        # Cache the data
-        await self._cache_prices(price_data, db)
+        return {
+            "data": {ticker: self._frame_to_records(frame) for ticker, frame in frames.items()},
+            "cached": not fetched,
+            "timestamp": datetime.now().isoformat()
+        }
 
-        return price_data
+    async def get_frames(self, tickers: List[str], start_date: date, end_date: date, db: Optional[Database] = None) -> Dict[str, pd.DataFrame]:
+        """Date-indexed OHLCV frames per ticker for an inclusive date range"""
+        frames, _ = await self._load_frames(tickers, start_date, end_date, db)
+        return frames
 
-    async def _get_cached_prices(self, tickers: List[str], period: str, db: sqlite3.Connection = None) -> Optional[Dict[str, Any]]:
-        """Check if prices are cached and still valid"""
+    async def _load_frames(self, tickers: List[str], start_date: date, end_date: date, db: Optional[Database] = None) -> Tuple[Dict[str, pd.DataFrame], bool]:
+        """Gap-fill the store for the range and read it back; reports whether anything was fetched"""
         if not db:
-            return None
-        cursor = db.cursor()
-
-        # Calculate date range
-        end_date = datetime.now()
-        if period == "1y":
-            start_date = end_date - timedelta(days=365)
-        elif period == "2y":
-            start_date = end_date - timedelta(days=730)
-        elif period == "5y":
-            start_date = end_date - timedelta(days=1825)
-        else:
-            start_date = end_date - timedelta(days=365)
-
-        # Check if we have recent data for all tickers
-        placeholders = ",".join(["?" for _ in tickers])
-        query = f"""
-            SELECT ticker, COUNT(*) as count, MAX(created_at) as last_update
-            FROM prices 
-            WHERE ticker IN ({placeholders}) 
-            AND date >= ? 
-            AND date <= ?
-            GROUP BY ticker
-        """
+            plan = {ticker: [(start_date, end_date)] for ticker in tickers}
+            return self._merge_fetched(await self._fetch_ranges(plan)), True
 
-        cursor.execute(
-            query, tickers + [start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")])
-        results = cursor.fetchall()
+        fetched = await self._fill_gaps(tickers, start_date, end_date, db)
 
-        # If we have data for all tickers and it's recent (within 1 hour), return cached data
-        if len(results) == len(tickers):
-            for result in results:
-                last_update = datetime.fromisoformat(result["last_update"])
-                if datetime.now() - last_update > timedelta(hours=1):
-                    return None
+        frames = await db.read(
+            lambda conn: self.store.read_frames(tickers, start_date, end_date, conn))
+        return frames, fetched
 
-            # Return cached data
-            return await self._fetch_cached_data(tickers, start_date, end_date, db)
-
-        return None
-
-    async def _fetch_cached_data(self, tickers: List[str], start_date: datetime, end_date: datetime, db: sqlite3.Connection = None) -> Dict[str, Any]:
-        """Fetch data from cache"""
-        if not db:
-            return None
-        cursor = db.cursor()
+    async def _fill_gaps(self, tickers: List[str], start_date: date, end_date: date, db: Database) -> bool:
+        """
+        Fetch and store the date ranges the store is missing for tickers.
 
-        placeholders = ",".join(["?" for _ in tickers])
-        query = f"""
-            SELECT ticker, date, open, high, low, close, volume
-            FROM prices 
-            WHERE ticker IN ({placeholders}) 
-            AND date >= ? 
-            AND date <= ?
-            ORDER BY ticker, date
+        Single-flight per ticker: when another request is already filling
+        one of the tickers, wait for it and plan again, so concurrent
+        requests only download what is still missing afterwards. Tickers
+        whose awaited download failed are served from the store rather than
+        retried by every waiter. Returns whether this call fetched anything.
+        """
+        failed: Set[str] = set()
+        while True:
+            running = {_gap_fills[t] for t in tickers if t in _gap_fills}
+            if running:
+                done, _ = await asyncio.wait(running)
+                for fill in done:
+                    failed |= fill.result()
+
+            # Work out which date ranges each ticker is missing
+            plan = await db.read(
+                lambda conn: self._plan_missing_ranges(tickers, start_date, end_date, conn))
+            plan = {t: ranges for t, ranges in plan.items() if t not in failed}
+            if not plan:
+                return False
+            # Another request claimed a ticker while we were planning
+            if not any(t in _gap_fills for t in plan):
+                break
+
+        fill = asyncio.get_running_loop().create_future()
+        for ticker in plan:
+            _gap_fills[ticker] = fill
+        errors = set(plan)
+        try:
+            fetched = await self._fetch_ranges(plan)
+            await self._store_fetched(fetched, db)
+            errors = {ticker for ticker, _, _, hist in fetched if hist is None}
+        finally:
+            for ticker in plan:
+                if _gap_fills.get(ticker) is fill:
+                    del _gap_fills[ticker]
+            fill.set_result(errors)
+        return True
+
+    def _period_range(self, period: str) -> Tuple[date, date]:
+        """Translate a yfinance-style period into an inclusive date range"""
+        end_date = datetime.now().date()
+        days = PERIOD_DAYS.get(period, PERIOD_DAYS["1y"])
+        return end_date - timedelta(days=days), end_date
+
+    def _plan_missing_ranges(self, tickers: List[str], start_date: date, end_date: date, conn: sqlite3.Connection) -> Dict[str, List[Tuple[date, date]]]:
         """
+        Return the date ranges to fetch per ticker.
 
-        cursor.execute(
-            query, tickers + [start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")])
-        results = cursor.fetchall()
+        Bars older than TRAILING_BARS are immutable, so only the head gap
+        before the stored window, the tail gap after it and (once the
+        refresh interval has passed) the trailing bars are requested.
 
-        # Convert to DataFrame format
-        data = {}
+        Gaps reach to the first/last stored bar, so each download includes
+        a bar known to exist: a gap with no bars of its own (before a
+        listing, or a holiday-only tail) comes back empty and is recorded
+        as covered, and only a failed download comes back as None.
+        """
+        cursor = conn.cursor()
+        placeholders = ",".join(["?" for _ in tickers])
+        cursor.execute(f"""
+            SELECT ticker, start_date, end_date, refreshed_at,
+                (SELECT MIN(date) FROM prices p WHERE p.ticker = c.ticker) AS first_bar,
+                (SELECT MAX(date) FROM prices p WHERE p.ticker = c.ticker) AS last_bar
+            FROM price_coverage c
+            WHERE ticker IN ({placeholders})
+        """, tickers)
+        coverage = {row["ticker"]: row for row in cursor.fetchall()}
+
+        now = datetime.now()
+        today = now.date()
+        plan = {}
         for ticker in tickers:
-            ticker_data = [dict(row)
-                           for row in results if row["ticker"] == ticker]
-            if ticker_data:
-                df = pd.DataFrame(ticker_data)
-                if 'date' in df.columns:
-                    df["date"] = pd.to_datetime(df["date"])
-                    df.set_index("date", inplace=True)
-
-                # Apply safe_float to all numeric columns
-                for col in ["open", "high", "low", "close", "volume"]:
-                    if col in df.columns:
-                        df[col] = df[col].apply(self._safe_float)
+            row = coverage.get(ticker)
+            if row is None:
+                plan[ticker] = [(start_date, end_date)]
+                continue
+
+            covered_start = date.fromisoformat(row["start_date"])
+            covered_end = date.fromisoformat(row["end_date"])
+            refreshed_at = datetime.fromisoformat(row["refreshed_at"])
+            ranges = []
+
+            if start_date < covered_start:
+                head_end = covered_start - timedelta(days=1)
+                if row["first_bar"]:
+                    head_end = max(head_end, date.fromisoformat(row["first_bar"]))
+                ranges.append((start_date, head_end))
+
+            # Trailing bars may have been revised since they were stored
+            recent = covered_end >= today - TRAILING_BARS
+            stale = now - refreshed_at > REFRESH_INTERVAL
+            if end_date > covered_end or (stale and recent and end_date >= covered_end - TRAILING_BARS):
+                # Keep the covered window contiguous: the tail always
+                # starts where stored history ends
+                tail_start = covered_end - TRAILING_BARS if recent else covered_end + timedelta(days=1)
+                if row["last_bar"]:
+                    tail_start = min(tail_start, date.fromisoformat(row["last_bar"]))
+                ranges.append((tail_start, max(end_date, covered_end)))
+
+            if ranges:
+                plan[ticker] = ranges
+
+        return plan
+
+    def _update_coverage(self, fetched: List[FetchResult], conn: sqlite3.Connection):
+        """Extend each ticker's covered window by the ranges fetched successfully"""
+        cursor = conn.cursor()
+        now = datetime.now().isoformat()
+
+        for ticker, start_date, end_date, hist in fetched:
+            if hist is None:
+                # Upstream error - leave the gap so it's retried next time
+                continue
+            cursor.execute("""
+                INSERT INTO price_coverage (ticker, start_date, end_date, refreshed_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(ticker) DO UPDATE SET
+                    start_date = MIN(start_date, excluded.start_date),
+                    end_date = MAX(end_date, excluded.end_date),
+                    refreshed_at = CASE
+                        WHEN excluded.end_date >= end_date THEN excluded.refreshed_at
+                        ELSE refreshed_at
+                    END
+            """, (ticker, start_date.isoformat(), end_date.isoformat(), now))
+
+    async def _fetch_ranges(self, plan: Dict[str, List[Tuple[date, date]]]) -> List[FetchResult]:
+        """Fetch the planned date ranges in batched multi-ticker downloads"""
+        windows = [
+            (ticker, start_date, end_date)
+            for ticker, ranges in plan.items()
+            for start_date, end_date in ranges
+        ]
+        return await self.fetcher.fetch_history(windows)
 
-                data[ticker] = df.to_dict("records")
+    def _merge_fetched(self, fetched: List[FetchResult]) -> Dict[str, pd.DataFrame]:
+        """Combine the fetched ranges into one normalized OHLCV frame per ticker"""
+        parts = {}
+        for ticker, _, _, hist in fetched:
+            if hist is not None and not hist.empty:
+                parts.setdefault(ticker, []).append(hist)
 
         return {
-            "data": data,
-            "cached": True,
-            "timestamp": datetime.now().isoformat()
+            ticker: PriceStore.normalize_frame(pd.concat(frames))
+            for ticker, frames in parts.items()
         }
 
-    async def _fetch_prices(self, tickers: List[str], period: str) -> Dict[str, Any]:
-        """Fetch prices from yfinance"""
+    async def prewarm(self, snapshot: FixtureProvider, db: Database) -> int:
+        """
+        Load every bar of a local snapshot into the store and mark it covered,
+        so requests inside the snapshot never go upstream. Returns rows loaded.
+        """
         loop = asyncio.get_event_loop()
+        fetched = await loop.run_in_executor(
+            None, lambda: snapshot.download_history(snapshot.snapshot_windows()))
+        frames = await self._store_fetched(fetched, db)
 
-        def fetch_ticker_data(ticker: str):
-            try:
-                stock = yf.Ticker(ticker)
-                hist = stock.history(period=period)
-                return ticker, hist
-            except Exception as e:
-                print(f"Error fetching data for {ticker}: {e}")
-                return ticker, None
-
-        # Fetch data concurrently
-        tasks = [loop.run_in_executor(
-            self.executor, fetch_ticker_data, ticker) for ticker in tickers]
-        results = await asyncio.gather(*tasks)
-
-        data = {}
-        for ticker, hist in results:
-            if hist is not None and not hist.empty:
-                # Convert to records format
-                hist_reset = hist.reset_index()
-                hist_reset["date"] = hist_reset["Date"].dt.strftime("%Y-%m-%d")
-
-                # Apply safe_float to all numeric columns to prevent NaN issues
-                hist_reset["Open"] = hist_reset["Open"].apply(self._safe_float)
-                hist_reset["High"] = hist_reset["High"].apply(self._safe_float)
-                hist_reset["Low"] = hist_reset["Low"].apply(self._safe_float)
-                hist_reset["Close"] = hist_reset["Close"].apply(
-                    self._safe_float)
-                hist_reset["Volume"] = hist_reset["Volume"].apply(
-                    self._safe_float)
-
-                data[ticker] = hist_reset[["date", "Open", "High",
-                                           "Low", "Close", "Volume"]].to_dict("records")
+        rows = sum(len(frame) for frame in frames.values())
+        print(f"📦 Pre-warmed {rows} price rows for {len(frames)} tickers from {snapshot.path}")
+        return rows
 
-        return {
-            "data": data,
-            "cached": False,
-            "timestamp": datetime.now().isoformat()
-        }
+    def _frame_to_records(self, frame: pd.DataFrame) -> List[Dict[str, Any]]:
+        records = frame.reset_index(names="date")
+        records["date"] = records["date"].dt.strftime("%Y-%m-%d")
+        return records.to_dict("records")
 
-    async def _cache_prices(self, price_data: Dict[str, Any], db: sqlite3.Connection = None):
-        """Cache price data to database"""
-        if not db:
-            return
-        cursor = db.cursor()
-
-        for ticker, records in price_data["data"].items():
-            for record in records:
-                cursor.execute("""
-                    INSERT OR REPLACE INTO prices 
-                    (ticker, date, open, high, low, close, volume, created_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    ticker,
-                    record["date"],
-                    record["Open"],
-                    record["High"],
-                    record["Low"],
-                    record["Close"],
-                    record["Volume"],
-                    datetime.now().isoformat()
-                ))
-
-        db.commit()
+    async def _store_fetched(self, fetched: List[FetchResult], db: Database) -> Dict[str, pd.DataFrame]:
+        """
+        Bulk-write fetched bars (only trailing bars may overwrite) and extend
+        coverage in one job on the writer queue. Returns the merged frames.
+        """
+        frames = self._merge_fetched(fetched)
+
+        def write(conn: sqlite3.Connection) -> Dict[str, Any]:
+            stats = self.store.ingest(frames, conn)
+            self._update_coverage(fetched, conn)
+            return stats
+
+        stats = await db.write(write)
+        if frames:
+            print(
+                f"💾 Cached {stats['rows']} price rows ({stats['rows_per_sec']:.0f} rows/sec)")
+        return frames
 
     def get_available_tickers(self) -> List[str]:
         """Get list of available tickers for the game"""
-        return [
-            # Stocks & ETFs
-            "VTI",  # Total Stock Market
-            "QQQ",  # Nasdaq 100
-            "SPY",  # S&P 500
-            "VEA",  # Developed Markets
-            "VWO",  # Emerging Markets
-
-            # Bonds
-            "BND",  # Total Bond Market
-            "TLT",  # 20+ Year Treasury
-            "IEF",  # 7-10 Year Treasury
-            "SHY",  # 1-3 Year Treasury
-
-            # Commodities
-            "GLD",  # Gold
-            "SLV",  # Silver
-            "DJP",  # Commodity Index
-
-            # REITs
-            "VNQ",  # Real Estate
-            "IYR",  # Real Estate
-            "SCHH",  # Real Estate
-
-            # Crypto (through ETFs)
-            "BITO",  # Bitcoin Strategy
-            "ETHE",  # Ethereum Strategy
-        ]
+        return list(AVAILABLE_TICKERS)
@@ -0,0 +1,148 @@
+import sqlite3
+import time
+from datetime import date, datetime, timedelta
+from itertools import repeat
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from database import DATABASE_URL
+
+
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+# Bars newer than this may still be revised upstream and are re-fetched
+TRAILING_BARS = timedelta(days=7)
+
+_INSERT_SQL = """
+    {verb} INTO prices
+    (ticker, date, open, high, low, close, volume, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+class PriceStore:
+    """Bulk read/write access to the SQLite ``prices`` table"""
+
+    def __init__(self, db_path: str = DATABASE_URL):
+        self.db_path = db_path
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @staticmethod
+    def normalize_frame(frame: pd.DataFrame) -> pd.DataFrame:
+        """Lower-case OHLCV columns on a date index, NaN/inf scrubbed to 0"""
+        frame = frame.rename(columns=str.lower)
+        frame = frame.reindex(columns=OHLCV_COLUMNS)
+        values = np.nan_to_num(
+            frame.to_numpy(dtype=float), nan=0.0, posinf=0.0, neginf=0.0)
+        index = pd.DatetimeIndex(frame.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        frame = pd.DataFrame(
+            values, index=index.normalize(), columns=OHLCV_COLUMNS)
+        return frame[~frame.index.duplicated(keep="last")].sort_index()
+
+    @staticmethod
+    def prepare_rows(ticker: str, frame: pd.DataFrame, created_at: str) -> Tuple[np.ndarray, List[tuple]]:
+        """Turn a normalized frame into (dates, insert tuples) in one step"""
+        dates = frame.index.strftime("%Y-%m-%d").to_numpy(dtype=str)
+        columns = frame.to_numpy().T
+        rows = list(zip(
+            repeat(ticker),
+            dates.tolist(),
+            columns[0].tolist(),
+            columns[1].tolist(),
+            columns[2].tolist(),
+            columns[3].tolist(),
+            columns[4].astype(np.int64).tolist(),
+            repeat(created_at),
+        ))
+        return dates, rows
+
+    def ingest(self, frames: Dict[str, pd.DataFrame], db: Optional[sqlite3.Connection] = None) -> Dict[str, Any]:
+        """
+        Write OHLCV frames with executemany in a single transaction.
+
+        Bars older than TRAILING_BARS are immutable (INSERT OR IGNORE);
+        trailing bars overwrite what is stored. A connection passed in
+        belongs to the caller, whose transaction the writes join (nothing
+        is committed here). Returns row count and throughput.
+        """
+        started = time.perf_counter()
+        created_at = datetime.now().isoformat()
+        mutable_from = (datetime.now().date() - TRAILING_BARS).isoformat()
+
+        historical: List[tuple] = []
+        trailing: List[tuple] = []
+        for ticker, frame in frames.items():
+            if frame is None or frame.empty:
+                continue
+            dates, rows = self.prepare_rows(
+                ticker, self.normalize_frame(frame), created_at)
+            split = int(np.searchsorted(dates, mutable_from))
+            historical.extend(rows[:split])
+            trailing.extend(rows[split:])
+
+        def write(conn: sqlite3.Connection):
+            if historical:
+                conn.executemany(
+                    _INSERT_SQL.format(verb="INSERT OR IGNORE"), historical)
+            if trailing:
+                conn.executemany(
+                    _INSERT_SQL.format(verb="INSERT OR REPLACE"), trailing)
+
+        if db is not None:
+            write(db)
+        else:
+            conn = self._connect()
+            try:
+                with conn:
+                    write(conn)
+            finally:
+                conn.close()
+
+        rows = len(historical) + len(trailing)
+        elapsed = time.perf_counter() - started
+        return {
+            "rows": rows,
+            "seconds": elapsed,
+            "rows_per_sec": rows / elapsed if elapsed > 0 else float(rows),
+        }
+
+    def read_frames(self, tickers: List[str], start_date: date, end_date: date, db: Optional[sqlite3.Connection] = None) -> Dict[str, pd.DataFrame]:
+        """Load stored bars as one date-indexed OHLCV frame per ticker"""
+        if not tickers:
+            return {}
+        placeholders = ",".join(["?" for _ in tickers])
+        query = f"""
+            SELECT ticker, date, open, high, low, close, volume
+            FROM prices
+            WHERE ticker IN ({placeholders})
+            AND date >= ?
+            AND date <= ?
+            ORDER BY ticker, date
+        """
+
+        conn = db or self._connect()
+        try:
+            df = pd.read_sql_query(
+                query, conn,
+                params=list(tickers) + [start_date.isoformat(), end_date.isoformat()])
+        finally:
+            if db is None:
+                conn.close()
+
+        df["date"] = pd.to_datetime(df["date"])
+        return {
+            ticker: group.set_index("date")[OHLCV_COLUMNS]
+            for ticker, group in df.groupby("ticker", sort=False)
+        }
+
+
+# Process-wide store shared by every PriceService
+price_store = PriceStore()
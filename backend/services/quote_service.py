@@ -0,0 +1,207 @@
+import asyncio
+import os
+import time
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Set
+
+from services.market_data_fetcher import MarketDataFetcher, market_data_fetcher
+
+
+# Frontend asset id -> yfinance ticker
+ID_TO_SYMBOL = {
+    "apple": "AAPL",
+    "microsoft": "MSFT",
+    "nvidia": "NVDA",
+    "tesla": "TSLA",
+    "sp500": "SPY",   # S&P500 ETF
+    "etf": "VT",      # Vanguard Total World ETF
+    # Crypto supported by Yahoo Finance spot ETFs, e.g., BTC-USD, ETH-USD
+    "bitcoin": "BTC-USD",
+    "ethereum": "ETH-USD",
+}
+
+# Served until the first successful refresh (and for symbols upstream skips)
+FALLBACK_PRICES = {
+    "AAPL": 175.50,
+    "MSFT": 380.25,
+    "NVDA": 850.75,
+    "TSLA": 245.80,
+    "SPY": 450.30,
+    "VT": 95.45,
+    "BTC-USD": 112495.65,
+    "ETH-USD": 4502.13,
+}
+
+# Seconds between background refreshes of every quote
+QUOTE_REFRESH_SECONDS = float(os.getenv("QUOTE_REFRESH_SECONDS", "60"))
+
+
+def latest_quote(frame: Optional[pd.DataFrame]) -> Optional[Dict[str, float]]:
+    """Last finite close and its change from the previous one, in percent"""
+    if frame is None or frame.empty or "Close" not in frame:
+        return None
+    close = frame["Close"].to_numpy(dtype=float)
+    close = close[np.isfinite(close)]
+    if close.size == 0 or close[-1] <= 0:
+        return None
+    latest = float(close[-1])
+    prev = float(close[-2]) if close.size > 1 else latest
+    change = (latest - prev) / prev * 100 if prev > 0 else 0.0
+    return {"currentPrice": round(latest, 2), "change": round(change, 2)}
+
+
+class QuoteSubscription:
+    """
+    One streaming client's view of the quote cache. Changes are merged into
+    a pending map, so a slow client gets the latest value per symbol instead
+    of a growing backlog.
+    """
+
+    def __init__(self, ids: List[str], id_to_symbol: Dict[str, str]):
+        self.ids_by_symbol: Dict[str, List[str]] = {}
+        for _id in ids:
+            if _id in id_to_symbol:
+                self.ids_by_symbol.setdefault(id_to_symbol[_id], []).append(_id)
+        self._pending: Dict[str, Dict[str, float]] = {}
+        self._changed = asyncio.Event()
+
+    def push(self, changes: Dict[str, Dict[str, float]]):
+        """Queue the changed quotes this client subscribed to"""
+        relevant = {s: q for s, q in changes.items() if s in self.ids_by_symbol}
+        if relevant:
+            self._pending.update(relevant)
+            self._changed.set()
+
+    async def next(self, timeout: float) -> List[Dict[str, Any]]:
+        """Wait for changed quotes (by id); empty after timeout without changes"""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._changed.clear()
+        pending, self._pending = self._pending, {}
+        return [
+            {"id": _id, **quote}
+            for symbol, quote in pending.items()
+            for _id in self.ids_by_symbol[symbol]
+        ]
+
+
+class QuoteService:
+    """
+    In-memory latest quote for every known symbol, kept fresh by one
+    background task that refreshes all symbols in a single upstream call.
+    """
+
+    def __init__(
+        self,
+        id_to_symbol: Optional[Dict[str, str]] = None,
+        fetcher: Optional[MarketDataFetcher] = None,
+        refresh_seconds: float = QUOTE_REFRESH_SECONDS,
+    ):
+        self.id_to_symbol = id_to_symbol or ID_TO_SYMBOL
+        self.fetcher = fetcher or market_data_fetcher
+        self.refresh_seconds = refresh_seconds
+
+        # symbol -> {"currentPrice", "change"}; updated by swapping the whole dict
+        self._quotes: Dict[str, Dict[str, float]] = self._fallback_quotes()
+        self.updated_at: Optional[float] = None
+        self.source = "fallback"
+        self._task: Optional[asyncio.Task] = None
+        self._refresh_lock = asyncio.Lock()
+        self._subscribers: Set[QuoteSubscription] = set()
+
+    def get_quotes(self, ids: List[str]) -> Dict[str, Any]:
+        """Quotes for the requested ids straight from memory, with their age"""
+        quotes = []
+        for _id in ids:
+            quote = self._quotes.get(self.id_to_symbol.get(_id))
+            if quote is not None:
+                quotes.append({"id": _id, **quote})
+
+        return {
+            "quotes": quotes,
+            "source": self.source,
+            "as_of": datetime.fromtimestamp(self.updated_at).isoformat() if self.updated_at else None,
+            "stale_seconds": round(time.time() - self.updated_at, 3) if self.updated_at else None,
+        }
+
+    async def refresh(self) -> bool:
+        """Fetch every symbol in one call; keeps the previous quotes on failure"""
+        async with self._refresh_lock:
+            symbols = sorted(set(self.id_to_symbol.values()))
+            try:
+                frames = await self.fetcher.fetch_recent(symbols)
+            except Exception as e:
+                print(f"❌ Quote refresh failed: {e}")
+                return False
+
+            fresh = {symbol: latest_quote(frames.get(symbol)) for symbol in symbols}
+            missing = [symbol for symbol, quote in fresh.items() if quote is None]
+            if len(missing) == len(symbols):
+                print("⚠️ Quote refresh returned no prices, keeping previous quotes")
+                return False
+            if missing:
+                print(f"⚠️ No quote data for {', '.join(missing)}")
+
+            changes = {
+                symbol: quote for symbol, quote in fresh.items()
+                if quote is not None and quote != self._quotes.get(symbol)
+            }
+            self._quotes = {**self._quotes, **changes}
+            self.updated_at = time.time()
+            self.source = "live"
+
+            # Fan the changed quotes out to every streaming client
+            for subscription in self._subscribers:
+                subscription.push(changes)
+            return True
+
+    def subscribe(self, ids: List[str]) -> QuoteSubscription:
+        """Register a streaming client for ids (every known id when empty)"""
+        subscription = QuoteSubscription(ids or list(self.id_to_symbol), self.id_to_symbol)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: QuoteSubscription):
+        self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    async def run(self):
+        """Refresh loop for the background task"""
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.refresh_seconds)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _fallback_quotes(self) -> Dict[str, Dict[str, float]]:
+        rng = np.random.default_rng()
+        return {
+            symbol: {
+                "currentPrice": price,
+                # Simulated -1% to +1% daily change
+                "change": round(float(rng.uniform(-1, 1)), 2),
+            }
+            for symbol, price in FALLBACK_PRICES.items()
+        }
+
+
+# Process-wide quote cache shared by /quotes
+quote_service = QuoteService()
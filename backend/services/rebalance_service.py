@@ -1,79 +1,196 @@
+import numpy as np
 from typing import Dict, List, Any
 from models import RebalanceRequest
 
 
+def plan_trades(
+    shares: np.ndarray,
+    prices: np.ndarray,
+    targets: np.ndarray,
+    cash: np.ndarray,
+    threshold: np.ndarray,
+    transaction_cost: np.ndarray,
+    fractional: np.ndarray,
+    min_trade_value: np.ndarray,
+    to_band: np.ndarray,
+) -> Dict[str, np.ndarray]:
+    """
+    Trade lists for a batch of portfolios, all arrays shaped (portfolios, assets)
+    or (portfolios,) for per-portfolio settings.
+
+    Only assets outside their tolerance band trade, either back to target or
+    to the nearest band edge. Sells are never rounded up and buys are scaled
+    so that they, plus costs, are funded by cash and net sale proceeds.
+    """
+    threshold, cost = threshold[:, None], transaction_cost[:, None]
+    fractional, min_trade = fractional[:, None], min_trade_value[:, None]
+
+    values = shares * prices
+    total = values.sum(axis=1, keepdims=True) + cash[:, None]
+    safe_total = np.where(total > 0, total, 1.0)
+    weights = values / safe_total
+    deviation = weights - targets
+    out_of_band = np.abs(deviation) > threshold
+
+    goal = np.where(to_band[:, None], targets + np.sign(deviation) * threshold, targets)
+    trade_values = np.where(out_of_band, goal * total - values, 0.0)
+    trade_values[np.abs(trade_values) < min_trade] = 0.0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        trade_shares = np.where(prices > 0, trade_values / prices, 0.0)
+
+    # Sell whole lots only, rounding toward zero, then size buys to what is funded
+    sells = np.minimum(trade_shares, 0.0)
+    sells = np.where(fractional, sells, np.trunc(sells))
+    proceeds = -(sells * prices).sum(axis=1, keepdims=True) * (1 - cost)
+    budget = cash[:, None] + proceeds
+
+    buys = np.maximum(trade_shares, 0.0)
+    wanted = (buys * prices).sum(axis=1, keepdims=True) * (1 + cost)
+    scale = np.where(wanted > budget, np.clip(budget, 0, None) / np.where(wanted > 0, wanted, 1.0), 1.0)
+    buys = buys * scale
+    buys = np.where(fractional, buys, np.floor(buys + 1e-9))
+
+    trade_shares = sells + buys
+    trade_values = trade_shares * prices
+    costs = np.abs(trade_values) * cost
+    new_shares = shares + trade_shares
+    new_cash = cash - trade_values.sum(axis=1) - costs.sum(axis=1)
+    new_total = (new_shares * prices).sum(axis=1) + new_cash
+
+    return {
+        "weights": weights,
+        "deviation": deviation,
+        "out_of_band": out_of_band,
+        "trade_shares": trade_shares,
+        "trade_values": trade_values,
+        "costs": costs,
+        "new_shares": new_shares,
+        "new_cash": new_cash,
+        "new_weights": new_shares * prices / np.where(new_total > 0, new_total, 1.0)[:, None],
+        # One-way turnover as a fraction of portfolio value
+        "turnover": np.abs(trade_values).sum(axis=1) / 2 / safe_total[:, 0],
+    }
+
+
 class RebalanceService:
     def __init__(self):
         pass
 
     async def rebalance(self, request: RebalanceRequest) -> Dict[str, Any]:
         """Auto-rebalance portfolio to target weights"""
+        return (await self.rebalance_batch([request]))[0]
 
-        current_weights = request.current_weights
-        target_weights = request.target_weights
-        threshold = request.rebalance_threshold
-        transaction_cost = request.transaction_cost
-
-        # Calculate deviations
-        deviations = {}
-        total_deviation = 0
-
-        for asset in target_weights:
-            current = current_weights.get(asset, 0)
-            target = target_weights[asset]
-            deviation = abs(current - target)
-            deviations[asset] = {
-                "current": current,
-                "target": target,
-                "deviation": deviation,
-                "needs_rebalance": deviation > threshold
-            }
-            total_deviation += deviation
+    async def rebalance_batch(self, requests: List[RebalanceRequest]) -> List[Dict[str, Any]]:
+        """Plan trades for many portfolios in one vectorized pass"""
+        if not requests:
+            return []
+
+        assets = list(dict.fromkeys(
+            asset for r in requests
+            for asset in [*r.target_weights, *self._holdings(r)]))
+        column = {asset: i for i, asset in enumerate(assets)}
+        n, m = len(requests), len(assets)
+
+        shares, prices, targets = np.zeros((n, m)), np.ones((n, m)), np.zeros((n, m))
+        for row, request in enumerate(requests):
+            for asset, held in self._holdings(request).items():
+                shares[row, column[asset]] = held
+            for asset, price in (request.prices or {}).items():
+                if asset in column:
+                    prices[row, column[asset]] = price
+            for asset, target in request.target_weights.items():
+                targets[row, column[asset]] = target
+
+        plan = plan_trades(
+            shares, prices, targets,
+            cash=np.array([r.cash if r.holdings else 0.0 for r in requests]),
+            threshold=np.array([r.rebalance_threshold for r in requests]),
+            transaction_cost=np.array([r.transaction_cost for r in requests]),
+            fractional=np.array([r.fractional_shares or not r.holdings for r in requests]),
+            min_trade_value=np.array([r.min_trade_value for r in requests]),
+            to_band=np.array([r.rebalance_to == "band" for r in requests]),
+        )
+        return [self._build_result(request, assets, plan, row)
+                for row, request in enumerate(requests)]
+
+    def _holdings(self, request: RebalanceRequest) -> Dict[str, float]:
+        """Shares held, or the current weights as one-unit 'shares' without holdings"""
+        if request.holdings:
+            missing = [a for a, held in request.holdings.items()
+                       if held and not (request.prices or {}).get(a)]
+            missing += [a for a in request.target_weights
+                        if not (request.prices or {}).get(a)]
+            if missing:
+                raise ValueError(f"Missing prices for {', '.join(sorted(set(missing)))}")
+            return request.holdings
+        return request.current_weights
 
-        # Determine if rebalancing is needed
-        needs_rebalance = total_deviation > threshold
+    def _build_result(self, request: RebalanceRequest, assets: List[str], plan: Dict[str, np.ndarray], row: int) -> Dict[str, Any]:
+        held = self._holdings(request)
+        relevant = [i for i, asset in enumerate(assets)
+                    if asset in request.target_weights or asset in held]
+        weights, deviation = plan["weights"][row], plan["deviation"][row]
+        out_of_band = plan["out_of_band"][row]
 
-        if not needs_rebalance:
+        deviations = {
+            assets[i]: {
+                "current": float(weights[i]),
+                "target": request.target_weights.get(assets[i], 0.0),
+                "deviation": float(abs(deviation[i])),
+                "needs_rebalance": bool(out_of_band[i])
+            }
+            for i in relevant
+        }
+        # Weight that has to move to reach target (half the summed deviations)
+        total_deviation = float(np.abs(deviation[relevant]).sum() / 2)
+        max_deviation = float(np.abs(deviation[relevant]).max()) if relevant else 0.0
+
+        if not out_of_band[relevant].any():
             return {
                 "needs_rebalance": False,
                 "message": "Portfolio is within rebalancing threshold",
                 "deviations": deviations,
                 "total_deviation": total_deviation,
-                "rebalance_actions": []
+                "max_deviation": max_deviation,
+                "rebalance_actions": [],
+                "total_transaction_cost": 0.0
             }
 
-        # Calculate rebalancing actions
+        trade_shares, trade_values = plan["trade_shares"][row], plan["trade_values"][row]
+        costs, new_weights = plan["costs"][row], plan["new_weights"][row]
         rebalance_actions = []
-        total_transaction_cost = 0
-
-        for asset, data in deviations.items():
-            if data["needs_rebalance"]:
-                current = data["current"]
-                target = data["target"]
-                difference = target - current
-
-                action = {
-                    "asset": asset,
-                    "current_weight": current,
-                    "target_weight": target,
-                    "adjustment": difference,
-                    "action": "buy" if difference > 0 else "sell",
-                    "amount": abs(difference)
-                }
-
-                # Calculate transaction cost
-                cost = abs(difference) * transaction_cost
-                action["transaction_cost"] = cost
-                total_transaction_cost += cost
-
-                rebalance_actions.append(action)
-
-        return {
+        for i in relevant:
+            if trade_shares[i] == 0:
+                continue
+            action = {
+                "asset": assets[i],
+                "current_weight": float(weights[i]),
+                "target_weight": request.target_weights.get(assets[i], 0.0),
+                "adjustment": float(new_weights[i] - weights[i]),
+                "action": "buy" if trade_shares[i] > 0 else "sell",
+                "amount": float(abs(new_weights[i] - weights[i])),
+                "transaction_cost": float(costs[i])
+            }
+            if request.holdings:
+                action["shares"] = float(abs(trade_shares[i]))
+                action["price"] = float(request.prices[assets[i]])
+                action["trade_value"] = float(abs(trade_values[i]))
+            rebalance_actions.append(action)
+
+        result = {
             "needs_rebalance": True,
-            "message": f"Portfolio needs rebalancing (deviation: {total_deviation:.1%})",
+            "message": f"Portfolio needs rebalancing (max deviation: {max_deviation:.1%})",
             "deviations": deviations,
             "total_deviation": total_deviation,
+            "max_deviation": max_deviation,
             "rebalance_actions": rebalance_actions,
-            "total_transaction_cost": total_transaction_cost,
-            "new_weights": target_weights
+            "total_transaction_cost": float(costs.sum()),
+            "turnover": float(plan["turnover"][row]),
+            "new_weights": {assets[i]: float(new_weights[i]) for i in relevant}
         }
+        if request.holdings:
+            result["new_holdings"] = {
+                assets[i]: float(plan["new_shares"][row, i]) for i in relevant}
+            result["cash_after"] = float(plan["new_cash"][row])
+        return result
@@ -0,0 +1,83 @@
+import json
+import math
+import numpy as np
+import pandas as pd
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is used instead
+    orjson = None
+
+
+def _finite(values: np.ndarray) -> Any:
+    """Array -> nested lists with NaN/inf as None, scrubbed in one op when any are present"""
+    if values.dtype.kind == "f" and not np.isfinite(values).all():
+        scrubbed = values.astype(object)
+        scrubbed[~np.isfinite(values)] = None
+        return scrubbed.tolist()
+    return values.tolist()
+
+
+def _default(obj: Any) -> Any:
+    """Bulk conversion of NumPy/pandas/pydantic objects the encoders don't know"""
+    if isinstance(obj, np.ndarray):
+        return _finite(obj)
+    if isinstance(obj, np.generic):
+        value = obj.item()
+        return None if isinstance(value, float) and not math.isfinite(value) else value
+    if isinstance(obj, pd.Series):
+        return _finite(obj.to_numpy())
+    if isinstance(obj, pd.DataFrame):
+        numeric = obj.select_dtypes("number").columns
+        frame = obj.astype({name: object for name in numeric})
+        frame[numeric] = frame[numeric].where(np.isfinite(obj[numeric].to_numpy(dtype=float)), None)
+        return frame.to_dict("records")
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, (datetime, date, pd.Timestamp)):
+        return obj.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def _null_non_finite(obj: Any) -> Any:
+    """Slow path for the stdlib encoder: stray non-finite floats become null"""
+    if isinstance(obj, float) and not math.isfinite(obj):
+        return None
+    if isinstance(obj, dict):
+        return {k: _null_non_finite(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_null_non_finite(v) for v in obj]
+    return obj
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Encode a response payload to JSON bytes.
+
+    Every non-finite float is written as null, whether it is a Python float,
+    a NumPy scalar or an element of an array/pandas object. With orjson,
+    NumPy arrays are encoded natively (which already writes NaN/inf as
+    null); other dtypes and pandas objects go through _default.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            content, default=_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    try:
+        encoded = json.dumps(content, default=_default, allow_nan=False, separators=(",", ":"))
+    except ValueError:
+        encoded = json.dumps(
+            _null_non_finite(content), default=_default, allow_nan=False, separators=(",", ":"))
+    return encoded.encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with dumps; return it directly to skip jsonable_encoder"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,9 +1,163 @@
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
 import asyncio
-from models import SimulationRequest, SimulationResponse
+import zlib
+from models import (
+    SimulationRequest, SimulationResponse, MonteCarloRequest, MonteCarloResponse
+)
+from services.payload_cache import PayloadCache, canonical_key, estimate_size
+from services.backtest_service import run_backtest, calendar_rebalance_indices, drawdown_series
+
+
+# Annualized characteristics used to generate synthetic price paths
+ASSET_CHARACTERISTICS = {
+    "VTI": {"volatility": 0.15, "annual_return": 0.08, "yield": 0.02},
+    "QQQ": {"volatility": 0.20, "annual_return": 0.12, "yield": 0.01},
+    "BND": {"volatility": 0.05, "annual_return": 0.04, "yield": 0.03},
+    "GLD": {"volatility": 0.12, "annual_return": 0.06, "yield": 0.00},
+    "VNQ": {"volatility": 0.18, "annual_return": 0.07, "yield": 0.04},
+    "BITO": {"volatility": 0.35, "annual_return": 0.15, "yield": 0.00},
+}
+DEFAULT_CHARACTERISTICS = {"volatility": 0.15, "annual_return": 0.08, "yield": 0.02}
+
+# Assets that share a common tech/equity factor
+TECH_ASSETS = {"VTI", "QQQ"}
+
+# Days after a move larger than this are scaled by CLUSTER_FACTOR
+CLUSTER_THRESHOLD = 0.02
+CLUSTER_FACTOR = 1.2
+
+# Fan chart percentiles for Monte Carlo runs
+PERCENTILES = [5, 25, 50, 75, 95]
+# Upper bound on float64 elements per (paths x assets x days) chunk
+MONTE_CARLO_CHUNK_ELEMENTS = 1_000_000
+DRAWDOWN_BINS = 20
+# Histogram bins per chart point when bands are too large to keep every path
+BAND_HISTOGRAM_BINS = 2048
+
+# Cost per traded dollar on simulated rebalances (same default as /rebalance)
+SIMULATION_TRANSACTION_COST = 0.001
+
+# Finished /simulate responses, keyed by everything that shapes the output
+simulation_cache = PayloadCache(
+    "simulations", max_entries=256, max_bytes=64 * 1024 * 1024,
+    sizeof=lambda response: estimate_size(response.__dict__))
+
+
+def apply_volatility_clustering(returns: np.ndarray) -> np.ndarray:
+    """
+    Scale each day's return by CLUSTER_FACTOR when the previous (already
+    scaled) return exceeded CLUSTER_THRESHOLD, along the last axis.
+
+    Equivalent to the sequential loop, expressed as a set/clear/carry
+    recurrence: a big raw move always flags the next day, a move too small
+    to cross the threshold even when scaled always clears it, and anything
+    in between carries the previous day's flag forward.
+    """
+    magnitude = np.abs(returns)
+    flags_next = magnitude > CLUSTER_THRESHOLD
+    decided = flags_next | (magnitude * CLUSTER_FACTOR <= CLUSTER_THRESHOLD)
+
+    n_days = returns.shape[-1]
+    positions = np.where(decided, np.arange(n_days), -1)
+    last_decided = np.maximum.accumulate(positions, axis=-1)
+    carried = np.take_along_axis(
+        flags_next, np.maximum(last_decided, 0), axis=-1) & (last_decided >= 0)
+
+    flags = np.zeros_like(carried)
+    flags[..., 1:] = carried[..., :-1]
+    return np.where(flags, returns * CLUSTER_FACTOR, returns)
+
+
+def generate_return_paths(assets: List[str], n_days: int, rng: np.random.Generator, n_paths: Optional[int] = None) -> np.ndarray:
+    """
+    Daily GBM returns for all assets at once, shape (n_assets, n_days) or
+    (n_paths, n_assets, n_days) when n_paths is given.
+    """
+    chars = [ASSET_CHARACTERISTICS.get(asset, DEFAULT_CHARACTERISTICS)
+             for asset in assets]
+    dt = 1/365  # Daily time step
+    drift = np.array([c["annual_return"] for c in chars]) * dt
+    vol = np.array([c["volatility"] for c in chars]) * np.sqrt(dt)
+
+    lead = () if n_paths is None else (n_paths,)
+    # Same draws as rng.normal(drift, vol), scaled in place to save copies
+    returns = rng.standard_normal(size=lead + (len(assets), n_days))
+    returns *= vol[:, None]
+    returns += drift[:, None]
+
+    # Add some volatility clustering
+    returns = apply_volatility_clustering(returns)
+
+    # Tech stocks move together through one shared factor per path
+    tech = np.array([asset in TECH_ASSETS for asset in assets])
+    if tech.any():
+        tech_factor = rng.normal(0, 0.01, size=lead + (1, n_days))
+        returns += tech_factor * 0.3 * tech[:, None]
+
+    return returns
+
+
+def compound_prices(returns: np.ndarray, start_price: float = 100.0) -> np.ndarray:
+    """Price paths from daily returns along the last axis"""
+    return start_price * np.cumprod(1 + returns, axis=-1)
+
+
+def value_holdings(prices: np.ndarray, daily_yields: np.ndarray, weights: np.ndarray, initial_capital: float) -> np.ndarray:
+    """
+    Value of each buy-and-hold position with its yield reinvested daily,
+    shape (..., n_assets, n_days) like ``prices`` (which start at 100).
+    """
+    n_days = prices.shape[-1]
+    reinvested = (1 + daily_yields[:, None]) ** np.arange(1, n_days + 1)
+    return initial_capital * weights[:, None] * prices / 100 * reinvested
+
+
+class ColumnHistogram:
+    """
+    Streaming percentiles per column of (rows x columns) batches.
+
+    Each column gets a fixed histogram spanning three times the first
+    batch's range (centered on it); percentiles are interpolated within
+    bins and clipped to the exact running min/max. Memory depends on the
+    column count only, not on how many rows are added.
+    """
+
+    def __init__(self, bins: int = BAND_HISTOGRAM_BINS):
+        self.bins = bins
+        self.counts: Optional[np.ndarray] = None
+
+    def add(self, values: np.ndarray):
+        lo, hi = values.min(axis=0), values.max(axis=0)
+        if self.counts is None:
+            span = np.maximum(hi - lo, np.abs(hi) * 1e-9 + 1e-12)
+            self.start = lo - span
+            self.width = 3 * span / self.bins
+            self.min, self.max = lo, hi
+            self.counts = np.zeros((values.shape[1], self.bins), dtype=np.int32)
+        else:
+            self.min, self.max = np.minimum(self.min, lo), np.maximum(self.max, hi)
+
+        index = np.clip(((values - self.start) / self.width).astype(np.int64), 0, self.bins - 1)
+        index += np.arange(values.shape[1]) * self.bins
+        self.counts += np.bincount(
+            index.ravel(), minlength=self.counts.size).reshape(self.counts.shape).astype(np.int32)
+
+    def percentiles(self, percentiles: List[float]) -> np.ndarray:
+        """(len(percentiles), columns) array, like np.percentile(..., axis=0)"""
+        cumulative = np.cumsum(self.counts, axis=1)
+        columns = np.arange(self.counts.shape[0])
+        bands = []
+        for percentile in percentiles:
+            target = percentile / 100 * cumulative[:, -1]
+            k = np.minimum((cumulative < target[:, None]).sum(axis=1), self.bins - 1)
+            before = np.where(k > 0, cumulative[columns, k - 1], 0)
+            in_bin = self.counts[columns, k]
+            fraction = np.where(in_bin > 0, (target - before) / np.maximum(in_bin, 1), 0.0)
+            bands.append(np.clip(self.start + (k + fraction) * self.width, self.min, self.max))
+        return np.array(bands)
 
 
 class SimulationService:
@@ -11,14 +165,38 @@ class SimulationService:
         self.risk_free_rate = 0.02  # 2% risk-free rate
 
     async def simulate(self, request: SimulationRequest) -> SimulationResponse:
-        """Simulate investment returns with cash flow breakdown"""
-
-        # Generate synthetic price data based on historical patterns
-        price_data = await self._generate_price_data(request)
+        """Simulate investment returns with cash flow breakdown (cached per seed)"""
+        seed = self._seed(request)
+        key = canonical_key(
+            "simulation",
+            asset_weights=request.asset_weights,
+            initial_capital=request.initial_capital,
+            time_horizon=request.time_horizon,
+            trading_type=request.trading_type.value,
+            rebalance_frequency=request.rebalance_frequency,
+            seed=seed,
+        )
+        response, _ = await simulation_cache.get_or_compute(
+            key, lambda: self._simulate(request, seed))
+        return response
+
+    def _seed(self, request: SimulationRequest) -> int:
+        """Explicit seed, or a stable one derived from the allocation and horizon"""
+        if request.seed is not None:
+            return request.seed
+        key = canonical_key(
+            "seed", asset_weights=request.asset_weights,
+            time_horizon=request.time_horizon)
+        return zlib.crc32(key.encode())
+
+    async def _simulate(self, request: SimulationRequest, seed: int) -> SimulationResponse:
+        # Generate synthetic price paths based on historical patterns
+        paths = await self._generate_price_paths(
+            request, np.random.default_rng(seed))
 
         # Calculate portfolio performance
         portfolio_performance = await self._calculate_portfolio_performance(
-            request, price_data
+            request, paths
         )
 
         # Calculate cash flow vs capital gains breakdown
@@ -49,140 +227,178 @@ class SimulationService:
             performance_chart=performance_chart
         )
 
-    async def _generate_price_data(self, request: SimulationRequest) -> Dict[str, pd.DataFrame]:
-        """Generate synthetic price data based on asset characteristics"""
-        # Define asset characteristics
-        asset_characteristics = {
-            "VTI": {"volatility": 0.15, "annual_return": 0.08, "yield": 0.02},
-            "QQQ": {"volatility": 0.20, "annual_return": 0.12, "yield": 0.01},
-            "BND": {"volatility": 0.05, "annual_return": 0.04, "yield": 0.03},
-            "GLD": {"volatility": 0.12, "annual_return": 0.06, "yield": 0.00},
-            "VNQ": {"volatility": 0.18, "annual_return": 0.07, "yield": 0.04},
-            "BITO": {"volatility": 0.35, "annual_return": 0.15, "yield": 0.00},
-        }
+    async def simulate_monte_carlo(self, request: MonteCarloRequest) -> MonteCarloResponse:
+        """Simulate many paths at once and summarize the outcome distribution"""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self._run_monte_carlo, request)
+
+    def _run_monte_carlo(self, request: MonteCarloRequest) -> MonteCarloResponse:
+        """Chunked (paths x assets x days) batch run, reduced to percentiles"""
+        rng = np.random.default_rng(self._seed(request))
+        dates = self._simulation_dates(request)
+        assets = self._held_assets(request)
+        weights = np.array([request.asset_weights[asset] for asset in assets])
+        yields = self._daily_yields(assets)
+        initial_capital = request.initial_capital
+
+        n_days = len(dates)
+        grid = np.unique(np.linspace(
+            0, n_days - 1, min(request.chart_points, n_days)).round().astype(int))
+        chunk = max(1, MONTE_CARLO_CHUNK_ELEMENTS // max(1, len(assets) * n_days))
+
+        # Only the grid columns, final values and drawdowns are kept per path;
+        # past the chunk budget the grid columns are folded into histograms
+        exact_bands = request.n_paths * len(grid) <= MONTE_CARLO_CHUNK_ELEMENTS
+        histogram = ColumnHistogram()
+        grid_values, final_values, max_drawdowns = [], [], []
+        for start in range(0, request.n_paths, chunk):
+            n = min(chunk, request.n_paths - start)
+            if assets:
+                prices = compound_prices(generate_return_paths(assets, n_days, rng, n_paths=n))
+                values = value_holdings(prices, yields, weights, initial_capital).sum(axis=-2)
+            else:
+                values = np.full((n, n_days), float(initial_capital))
+            if exact_bands:
+                grid_values.append(values[:, grid])
+            else:
+                histogram.add(values[:, grid])
+            # Copy so the slice doesn't keep the whole chunk alive
+            final_values.append(values[:, -1].copy())
+            max_drawdowns.append(drawdown_series(values, initial_capital).max(axis=-1))
+
+        final_values = np.concatenate(final_values)
+        max_drawdowns = np.concatenate(max_drawdowns)
+
+        labels = [f"p{p}" for p in PERCENTILES]
+        if exact_bands:
+            bands = np.percentile(np.concatenate(grid_values), PERCENTILES, axis=0)
+        else:
+            bands = histogram.percentiles(PERCENTILES)
+        counts, edges = np.histogram(
+            max_drawdowns, bins=DRAWDOWN_BINS, range=(0.0, max(float(max_drawdowns.max()), 1e-9)))
+
+        return MonteCarloResponse(
+            n_paths=request.n_paths,
+            expected_final_value=float(final_values.mean()),
+            probability_of_loss=float((final_values < initial_capital).mean()),
+            final_value_percentiles=dict(zip(
+                labels, np.percentile(final_values, PERCENTILES).tolist())),
+            percentile_bands={
+                "dates": np.datetime_as_string(dates.to_numpy()[grid], unit="s").tolist(),
+                **{label: band.tolist() for label, band in zip(labels, bands)},
+            },
+            drawdown_distribution={
+                "mean": float(max_drawdowns.mean()),
+                "percentiles": dict(zip(
+                    labels, np.percentile(max_drawdowns, PERCENTILES).tolist())),
+                "histogram": {"bin_edges": edges.tolist(), "counts": counts.tolist()},
+            },
+        )
 
-        # Generate date range
+    def _simulation_dates(self, request: SimulationRequest) -> pd.DatetimeIndex:
+        """Daily dates covering the simulated horizon, ending today"""
         start_date = datetime.now() - timedelta(days=request.time_horizon)
-        dates = pd.date_range(start=start_date, end=datetime.now(), freq="D")
+        return pd.date_range(start=start_date, end=datetime.now(), freq="D")
 
-        price_data = {}
+    def _held_assets(self, request: SimulationRequest) -> List[str]:
+        return [asset for asset, weight in request.asset_weights.items()
+                if weight > 0]
 
-        for asset, weight in request.asset_weights.items():
-            if weight > 0:
-                char = asset_characteristics.get(asset, {
-                    "volatility": 0.15, "annual_return": 0.08, "yield": 0.02
-                })
-
-                # Generate price series using geometric Brownian motion
-                dt = 1/365  # Daily time step
-                returns = np.random.normal(
-                    char["annual_return"] * dt,
-                    char["volatility"] * np.sqrt(dt),
-                    len(dates)
-                )
-
-                # Add some market events based on the time period
-                returns = await self._add_market_events(returns, dates, asset)
-
-                # Calculate prices
-                prices = [100]  # Start at 100
-                for ret in returns:
-                    prices.append(prices[-1] * (1 + ret))
-
-                # Create DataFrame
-                df = pd.DataFrame({
-                    "date": dates,
-                    "price": prices[1:],
-                    "return": returns,
-                    "yield": char["yield"] / 365  # Daily yield
-                })
-
-                price_data[asset] = df
-
-        return price_data
-
-    async def _add_market_events(self, returns: np.ndarray, dates: pd.DatetimeIndex, asset: str) -> np.ndarray:
-        """Add market events to make the simulation more realistic"""
-        # Add some volatility clustering
-        for i in range(1, len(returns)):
-            if abs(returns[i-1]) > 0.02:  # High volatility day
-                returns[i] *= 1.2  # Increase volatility
-
-        # Add some correlation between assets
-        if asset in ["VTI", "QQQ"]:
-            # Tech stocks correlation
-            tech_factor = np.random.normal(0, 0.01, len(returns))
-            returns += tech_factor * 0.3
-
-        return returns
-
-    async def _calculate_portfolio_performance(self, request: SimulationRequest, price_data: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
-        """Calculate portfolio performance metrics"""
-
-        # Initialize portfolio
-        portfolio_value = request.initial_capital
-        portfolio_history = []
-        daily_returns = []
-
-        # Get the date range
-        dates = list(price_data.values())[0]["date"] if price_data else []
-
-        for i, date in enumerate(dates):
-            total_value = 0
-            daily_return = 0
-
-            for asset, weight in request.asset_weights.items():
-                if weight > 0 and asset in price_data:
-                    asset_value = portfolio_value * weight * \
-                        price_data[asset].iloc[i]["price"] / 100
-                    total_value += asset_value
-
-                    # Add yield income
-                    yield_income = asset_value * \
-                        price_data[asset].iloc[i]["yield"]
-                    total_value += yield_income
-
-            if i > 0:
-                daily_return = (total_value - portfolio_value) / \
-                    portfolio_value
-                daily_returns.append(daily_return)
-
-            portfolio_value = total_value
-            portfolio_history.append({
-                "date": date,
-                "value": portfolio_value,
-                "return": daily_return
-            })
+    def _daily_yields(self, assets: List[str]) -> np.ndarray:
+        return np.array([
+            ASSET_CHARACTERISTICS.get(asset, DEFAULT_CHARACTERISTICS)["yield"]
+            for asset in assets]) / 365
+
+    async def _generate_price_paths(self, request: SimulationRequest, rng: Optional[np.random.Generator] = None) -> Dict[str, Any]:
+        """Generate every held asset's price path as one (n_assets, n_days) matrix"""
+        rng = rng or np.random.default_rng()
+
+        dates = self._simulation_dates(request)
+        assets = self._held_assets(request)
+        returns = generate_return_paths(assets, len(dates), rng)
+
+        return {
+            "assets": assets,
+            "dates": dates,
+            "returns": returns,
+            "prices": compound_prices(returns),
+            "yields": self._daily_yields(assets),
+        }
+
+    async def _calculate_portfolio_performance(self, request: SimulationRequest, paths: Dict[str, Any]) -> Dict[str, Any]:
+        """Calculate portfolio performance metrics over the (assets x days) price matrix"""
+        prices = paths["prices"]
+        weights = np.array([request.asset_weights[asset] for asset in paths["assets"]])
+        initial_capital = request.initial_capital
+
+        rebalance_events = []
+        if paths["assets"] and request.trading_type == "open" and request.rebalance_frequency > 0:
+            values, rebalance_events = self._rebalanced_values(request, paths, weights)
+        elif paths["assets"]:
+            holdings = value_holdings(prices, paths["yields"], weights, initial_capital)
+            values = holdings.sum(axis=0)
+        else:
+            values = np.full(len(paths["dates"]), float(initial_capital))
+
+        daily_returns = values[1:] / values[:-1] - 1
+        final_value = float(values[-1])
 
         # Calculate metrics
-        total_return = (portfolio_value -
-                        request.initial_capital) / request.initial_capital
+        total_return = (final_value - initial_capital) / initial_capital
         annualized_return = (1 + total_return) ** (365 /
                                                    request.time_horizon) - 1
-        volatility = np.std(daily_returns) * np.sqrt(365)
+        volatility = float(np.std(daily_returns) * np.sqrt(365)) if daily_returns.size else 0.0
         sharpe_ratio = (annualized_return - self.risk_free_rate) / \
             volatility if volatility > 0 else 0
 
-        # Calculate max drawdown
-        peak = request.initial_capital
-        max_drawdown = 0
-        for point in portfolio_history:
-            if point["value"] > peak:
-                peak = point["value"]
-            drawdown = (peak - point["value"]) / peak
-            max_drawdown = max(max_drawdown, drawdown)
+        max_drawdown = float(drawdown_series(values, initial_capital).max())
+
+        # Price-only gain per asset (yield income is reported as cash flow)
+        initial_values = initial_capital * weights
+        capital_gains = initial_values * (prices[:, -1] / 100 - 1)
 
         return {
-            "final_value": portfolio_value,
+            "final_value": final_value,
             "total_return": total_return,
             "annualized_return": annualized_return,
             "volatility": volatility,
             "sharpe_ratio": sharpe_ratio,
             "max_drawdown": max_drawdown,
-            "portfolio_history": portfolio_history,
-            "capital_gains_breakdown": await self._calculate_capital_gains_breakdown(request, price_data)
+            "dates": paths["dates"],
+            "values": values,
+            "returns": np.concatenate([[0.0], daily_returns]),
+            "capital_gains_breakdown": dict(zip(paths["assets"], capital_gains.tolist())),
+            "rebalance_events": rebalance_events
         }
 
+    def _rebalanced_values(self, request: SimulationRequest, paths: Dict[str, Any], weights: np.ndarray):
+        """
+        Portfolio value with calendar rebalancing back to target weights.
+
+        Yields are folded into total-return prices and a base column at 100
+        is prepended for the purchase, so without any rebalance this matches
+        value_holdings exactly.
+        """
+        prices, dates = paths["prices"], paths["dates"]
+        n_days = prices.shape[1]
+        total_return = prices * (1 + paths["yields"][:, None]) ** np.arange(1, n_days + 1)
+        bars = np.hstack([np.full((len(weights), 1), 100.0), total_return])
+        bar_dates = pd.DatetimeIndex(dates).insert(0, pd.Timestamp(dates[0]) - pd.Timedelta(days=1))
+
+        invested = request.initial_capital * weights.sum()
+        result = run_backtest(
+            bars, weights / weights.sum(), invested, SIMULATION_TRANSACTION_COST,
+            calendar_rebalance_indices(bar_dates, request.rebalance_frequency))
+
+        events = [{
+            "date": bar_dates[e["index"]].isoformat(),
+            "action": "rebalance",
+            "description": f"Rebalanced portfolio to target weights ({e['turnover']:.1%} turnover)",
+            "turnover": e["turnover"],
+            "cost": e["cost"],
+        } for e in result["events"]]
+        return result["equity"][1:], events
+
     async def _calculate_cash_flow_breakdown(self, request: SimulationRequest, portfolio_performance: Dict[str, Any]) -> Dict[str, float]:
         """Calculate cash flow vs capital gains breakdown"""
         cash_flow_breakdown = {}
@@ -198,40 +414,16 @@ class SimulationService:
 
         return cash_flow_breakdown
 
-    async def _calculate_capital_gains_breakdown(self, request: SimulationRequest, price_data: Dict[str, pd.DataFrame]) -> Dict[str, float]:
-        """Calculate capital gains breakdown by asset"""
-        capital_gains_breakdown = {}
-
-        for asset, weight in request.asset_weights.items():
-            if weight > 0 and asset in price_data:
-                initial_value = request.initial_capital * weight
-                final_price = price_data[asset].iloc[-1]["price"]
-                capital_gain = initial_value * (final_price / 100 - 1)
-                capital_gains_breakdown[asset] = capital_gain
-
-        return capital_gains_breakdown
-
     async def _calculate_rebalance_events(self, request: SimulationRequest, portfolio_performance: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Calculate rebalancing events"""
-        rebalance_events = []
-
-        if request.trading_type == "open" and request.rebalance_frequency > 0:
-            # Simulate rebalancing events
-            for i in range(0, request.time_horizon, request.rebalance_frequency):
-                rebalance_events.append({
-                    "date": (datetime.now() - timedelta(days=request.time_horizon - i)).isoformat(),
-                    "action": "rebalance",
-                    "description": f"Rebalanced portfolio to target weights"
-                })
-
-        return rebalance_events
+        return portfolio_performance["rebalance_events"]
 
     async def _generate_performance_chart(self, portfolio_performance: Dict[str, Any]) -> Dict[str, Any]:
         """Generate performance chart data"""
-        history = portfolio_performance["portfolio_history"]
+        dates = pd.DatetimeIndex(portfolio_performance["dates"])
 
         return {
-            "dates": [point["date"] for point in history],
-            "values": [point["value"] for point in history],
-            "returns": [point["return"] for point in history]
+            "dates": np.datetime_as_string(dates.to_numpy(), unit="s").tolist(),
+            "values": portfolio_performance["values"].tolist(),
+            "returns": portfolio_performance["returns"].tolist()
         }
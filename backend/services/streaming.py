@@ -0,0 +1,79 @@
+import numpy as np
+from typing import Dict, List, Any, Iterable, Iterator, Sequence
+
+from services.serialization import dumps
+from services.synthetic_price_service import OHLCV_COLUMNS
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+SSE_MEDIA_TYPE = "text/event-stream"
+
+# Comment line sent to idle SSE clients this often so proxies keep the stream open
+SSE_KEEPALIVE_SECONDS = 15.0
+
+# Bars per streamed record; bounds per-line memory regardless of history length
+STREAM_CHUNK_ROWS = 2000
+
+
+def wants_ndjson(format: str, accept: str = "") -> bool:
+    """True for ?format=ndjson or an Accept header asking for NDJSON"""
+    return format == "ndjson" or NDJSON_MEDIA_TYPE in (accept or "")
+
+
+def ndjson_lines(records: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """Encode each record as one compact JSON line"""
+    for record in records:
+        yield dumps(record) + b"\n"
+
+
+def sse_event(event: str, data: Any) -> bytes:
+    """One Server-Sent Events message with a JSON payload"""
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+def price_records(
+    ticker: str,
+    dates: Sequence[str],
+    columns: Dict[str, np.ndarray],
+    layout: str = "records",
+    chunk_rows: int = STREAM_CHUNK_ROWS,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Per-chunk price records for one ticker, converted slice by slice from
+    the column arrays so at most one chunk is ever materialized as lists
+    (columnar chunks stay array slices).
+    """
+    for start in range(0, len(dates), chunk_rows):
+        end = start + chunk_rows
+        record = {"ticker": ticker, "offset": start}
+        if layout == "columnar":
+            # Array slices are views; dumps encodes them without building lists
+            record.update({
+                "dates": list(dates[start:end]),
+                **{name: columns[name][start:end] for name in OHLCV_COLUMNS}})
+        else:
+            chunk = {name: columns[name][start:end].tolist() for name in OHLCV_COLUMNS}
+            record["records"] = [
+                {"date": d, "open": o, "high": h, "low": l, "close": c, "volume": v}
+                for d, o, h, l, c, v in zip(
+                    dates[start:end], *(chunk[name] for name in OHLCV_COLUMNS))
+            ]
+        yield record
+
+
+def metrics_records(
+    ticker: str,
+    metrics: Dict[str, Any],
+    chunk_rows: int = STREAM_CHUNK_ROWS,
+) -> Iterator[Dict[str, Any]]:
+    """A summary record without chart_data, then chart_data in chunks"""
+    chart_data: List[Dict[str, Any]] = metrics.get("chart_data", [])
+    summary = {k: v for k, v in metrics.items() if k != "chart_data"}
+    yield {"ticker": ticker, "type": "summary", "metrics": summary}
+    for start in range(0, len(chart_data), chunk_rows):
+        yield {
+            "ticker": ticker,
+            "type": "chart_data",
+            "offset": start,
+            "chart_data": chart_data[start:start + chunk_rows],
+        }
@@ -0,0 +1,184 @@
+import os
+import zlib
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+from services.downsampling import bucket_edges, ohlc_buckets
+from services.payload_cache import PayloadCache
+
+
+START_YEAR = 1990
+BASE_PRICE = 100.0
+
+# Shape of each synthetic series: total growth over the whole range,
+# market cycles as (amplitude, period in years) and daily noise level
+TICKER_PROFILES = {
+    # Stock market - 200% growth with 7-year and 3-year boom/bust cycles
+    "VTI": {"growth": 2.0, "cycles": [(0.3, 7), (0.1, 3)], "noise": 0.02},
+    # Bonds - 80% steady growth
+    "BND": {"growth": 0.8, "cycles": [], "noise": 0.005},
+    # Gold - 120% growth, volatile 5-year cycle
+    "GLD": {"growth": 1.2, "cycles": [(0.3, 5)], "noise": 0.03},
+}
+DEFAULT_PROFILE = {"growth": 1.5, "cycles": [], "noise": 0.02}
+
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+# Generated series (arrays, list views, bucketed candles) are memoized by
+# byte size so arbitrary tickers or resolutions can't pin unbounded memory
+series_cache = PayloadCache(
+    "synthetic_series",
+    max_entries=512,
+    max_bytes=int(os.getenv("SYNTHETIC_CACHE_MAX_MB", "64")) * 1024 * 1024,
+    ttl=None,
+)
+
+_MISSING = object()
+
+
+def _memoized(key: str, build: Callable[[], Any]) -> Any:
+    value = series_cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = build()
+        series_cache.set(key, value)
+    return value
+
+
+def ticker_seed(ticker: str) -> int:
+    """Stable per-ticker seed (unlike hash(), not salted per process)"""
+    return zlib.crc32(ticker.encode("utf-8"))
+
+
+@lru_cache(maxsize=8)
+def _date_axis(start_year: int, end_year: int) -> Tuple[pd.DatetimeIndex, List[str]]:
+    """Daily date index and its ISO strings, built once per year range"""
+    dates = pd.date_range(
+        start=f"{start_year}-01-01", end=f"{end_year}-12-31", freq="D")
+    return dates, dates.strftime("%Y-%m-%d").tolist()
+
+
+def _ticker_columns(ticker: str, start_year: int, end_year: int) -> Dict[str, np.ndarray]:
+    """Full OHLCV columns for one ticker (memoized in series_cache)"""
+    return _memoized(
+        f"columns:{ticker}:{start_year}:{end_year}",
+        lambda: _generate_columns(ticker, start_year, end_year))
+
+
+def _generate_columns(ticker: str, start_year: int, end_year: int) -> Dict[str, np.ndarray]:
+    """Generate the full OHLCV columns for one ticker in a single vectorized pass"""
+    dates, _ = _date_axis(start_year, end_year)
+    n = len(dates)
+    profile = TICKER_PROFILES.get(ticker, DEFAULT_PROFILE)
+    rng = np.random.RandomState(ticker_seed(ticker))
+
+    day = np.arange(n)
+    level = 1 + np.linspace(0, profile["growth"], n)
+    for amplitude, period_years in profile["cycles"]:
+        level += amplitude * np.sin(2 * np.pi * day / (365 * period_years))
+    level += rng.randn(n) * profile["noise"]
+
+    # Ensure prices don't go negative, then scrub NaN/inf in one array op
+    close = np.maximum(BASE_PRICE * level, BASE_PRICE * 0.1)
+    close = np.nan_to_num(close, nan=0.0, posinf=0.0, neginf=0.0)
+
+    columns = {
+        "open": close * 0.99,
+        "high": close * 1.01,
+        "low": close * 0.98,
+        "close": close,
+        "volume": rng.uniform(1000000, 5000000, n).astype(np.int64),
+    }
+    for values in columns.values():
+        values.setflags(write=False)
+    return columns
+
+
+def _bucketed_columns(ticker: str, start_year: int, end_year: int, max_points: int) -> Dict[str, np.ndarray]:
+    """OHLCV candles aggregated down to at most max_points, memoized per resolution"""
+    def build():
+        _, columns = ohlc_buckets(_ticker_columns(ticker, start_year, end_year), max_points)
+        for values in columns.values():
+            values.setflags(write=False)
+        return columns
+
+    return _memoized(f"buckets:{ticker}:{start_year}:{end_year}:{max_points}", build)
+
+
+def _bucket_dates(start_year: int, end_year: int, max_points: int) -> List[str]:
+    """Date of the first bar in each bucket (the same for every ticker)"""
+    _, dates = _date_axis(start_year, end_year)
+    if max_points >= len(dates):
+        return dates
+    return _memoized(
+        f"bucket_dates:{start_year}:{end_year}:{max_points}",
+        lambda: [dates[i] for i in bucket_edges(len(dates), max_points)[:-1]])
+
+
+def _columns(ticker: str, start_year: int, end_year: int, max_points: Optional[int]) -> Dict[str, np.ndarray]:
+    if max_points is None:
+        return _ticker_columns(ticker, start_year, end_year)
+    return _bucketed_columns(ticker, start_year, end_year, max_points)
+
+
+def _ticker_lists(ticker: str, start_year: int, end_year: int, max_points: Optional[int] = None) -> Dict[str, List]:
+    """Plain-list view of the generated columns, converted once per series and resolution"""
+    def build():
+        columns = _columns(ticker, start_year, end_year, max_points)
+        return {name: columns[name].tolist() for name in OHLCV_COLUMNS}
+
+    return _memoized(f"lists:{ticker}:{start_year}:{end_year}:{max_points}", build)
+
+
+class SyntheticPriceService:
+    """Deterministic synthetic OHLCV series used by the /prices endpoint"""
+
+    def __init__(self, start_year: int = START_YEAR):
+        self.start_year = start_year
+
+    def get_columns(self, ticker: str, end_year: Optional[int] = None, max_points: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Read-only OHLCV arrays for a ticker (memoized per year range and resolution)"""
+        end_year = end_year or datetime.now().year
+        return _columns(ticker, self.start_year, end_year, max_points)
+
+    def get_dates(self, end_year: Optional[int] = None, max_points: Optional[int] = None) -> List[str]:
+        """ISO date strings shared by every generated series (bucket starts when downsampled)"""
+        end_year = end_year or datetime.now().year
+        if max_points is None:
+            return _date_axis(self.start_year, end_year)[1]
+        return _bucket_dates(self.start_year, end_year, max_points)
+
+    def get_prices(self, tickers: List[str], layout: str = "records", max_points: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Build the price payload for several tickers.
+
+        layout="records" returns a list of {date, open, high, low, close, volume}
+        dicts per ticker; layout="columnar" returns one array per column.
+        max_points aggregates the daily bars into at most that many candles.
+        """
+        end_year = datetime.now().year
+        dates = self.get_dates(end_year, max_points)
+
+        data = {}
+        for ticker in tickers:
+            if layout == "columnar":
+                # The read-only arrays are encoded natively by dumps
+                columns = _columns(ticker, self.start_year, end_year, max_points)
+                data[ticker] = self._to_columnar(dates, columns)
+            else:
+                columns = _ticker_lists(ticker, self.start_year, end_year, max_points)
+                data[ticker] = self._to_records(dates, columns)
+
+        return data
+
+    def _to_columnar(self, dates: List[str], columns: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        return {"dates": dates, **columns}
+
+    def _to_records(self, dates: List[str], columns: Dict[str, List]) -> List[Dict[str, Any]]:
+        return [
+            {"date": d, "open": o, "high": h, "low": l, "close": c, "volume": v}
+            for d, o, h, l, c, v in zip(
+                dates, *(columns[name] for name in OHLCV_COLUMNS))
+        ]
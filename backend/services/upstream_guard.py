@@ -0,0 +1,129 @@
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+# Consecutive failures that open a circuit, and how long it stays open
+UPSTREAM_FAILURE_THRESHOLD = int(os.getenv("UPSTREAM_FAILURE_THRESHOLD", "3"))
+UPSTREAM_RESET_SECONDS = float(os.getenv("UPSTREAM_RESET_SECONDS", "30"))
+
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of waiting on an upstream that timed out or is failing"""
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    """Raised without calling upstream while the circuit is open"""
+
+
+class WorkersBusyError(UpstreamUnavailable):
+    """Raised without calling upstream while every upstream worker is occupied"""
+
+
+class UpstreamGuard:
+    """
+    Timeout plus circuit breaker around one kind of upstream call.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls fail immediately for ``reset_seconds``; then a single trial call
+    is let through (half-open) and its outcome closes or re-opens it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        timeout: float,
+        failure_threshold: int = UPSTREAM_FAILURE_THRESHOLD,
+        reset_seconds: float = UPSTREAM_RESET_SECONDS,
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+
+        self.calls = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    async def call(
+        self,
+        fn: Callable[[], Awaitable[Any]],
+        failed: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """
+        Await ``fn()`` within the timeout. ``failed`` flags results that
+        count as failures without raising (e.g. every symbol came back empty).
+        """
+        state = self.state
+        if state == "open" or (state == "half_open" and self._trial_running):
+            self.rejected += 1
+            raise CircuitOpenError(f"{self.name} circuit is open")
+
+        trial = state == "half_open"
+        self._trial_running = trial
+        self.calls += 1
+        try:
+            result = await asyncio.wait_for(fn(), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self._record_failure()
+            raise UpstreamUnavailable(f"{self.name} timed out after {self.timeout:g}s")
+        except WorkersBusyError:
+            # Local back-pressure, not an upstream failure
+            self.rejected += 1
+            raise
+        except Exception:
+            self.errors += 1
+            self._record_failure()
+            raise
+        finally:
+            if trial:
+                self._trial_running = False
+
+        if failed is not None and failed(result):
+            self.errors += 1
+            self._record_failure()
+        else:
+            self.failures = 0
+            self.opened_at = None
+        return result
+
+    def _record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold or self.opened_at is not None:
+            if self.opened_at is None:
+                print(f"🔌 {self.name} circuit opened after {self.failures} failures")
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "state": self.state,
+            "timeout": self.timeout,
+            "consecutive_failures": self.failures,
+            "calls": self.calls,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "rejected": self.rejected,
+        }
+
+
+# Per-endpoint guards shared by every yfinance caller
+history_guard = UpstreamGuard(
+    "yfinance_history", timeout=float(os.getenv("UPSTREAM_HISTORY_TIMEOUT", "20")))
+quotes_guard = UpstreamGuard(
+    "yfinance_quotes", timeout=float(os.getenv("UPSTREAM_QUOTES_TIMEOUT", "8")))
@@ -1,106 +1,116 @@
 import numpy as np
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
 from models import YieldSimRequest
 
 
+# Legacy sleeves: name -> (allocation key, yield key) used in the response
+LEGACY_SLEEVES = {
+    "bond": ("bonds", "bond_yield"),
+    "reit": ("reits", "reit_yield"),
+    "crypto": ("crypto", "crypto_apy"),
+}
+
+
+def income_series(capital: np.ndarray, annual_yields: np.ndarray, days: np.ndarray, reinvest: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Daily and cumulative income, shape (n_sleeves, n_days), on the given
+    1-based days. Paid-out income is flat; reinvested income compounds
+    daily, so the cumulative sum is the geometric series C * ((1 + r)^t - 1).
+    """
+    rate = (annual_yields / 365)[:, None]
+    principal = capital[:, None]
+    if reinvest:
+        growth = (1 + rate) ** days
+        daily = principal * rate * growth / (1 + rate)
+        cumulative = principal * (growth - 1)
+    else:
+        daily = np.broadcast_to(principal * rate, (len(capital), len(days)))
+        cumulative = daily * days
+    return daily, cumulative
+
+
 class YieldSimService:
     def __init__(self):
         pass
 
     async def simulate(self, request: YieldSimRequest) -> Dict[str, Any]:
-        """Simulate passive income from bonds, REITs, crypto"""
-
+        """Simulate passive income from bonds, REITs, crypto or any custom sleeves"""
         initial_capital = request.initial_capital
         time_horizon = request.time_horizon
 
-        # Calculate allocations
-        bond_allocation = request.bond_allocation
-        reit_allocation = request.reit_allocation
-        crypto_allocation = request.crypto_allocation
-
-        # Calculate capital allocation
-        bond_capital = initial_capital * bond_allocation
-        reit_capital = initial_capital * reit_allocation
-        crypto_capital = initial_capital * crypto_allocation
-
-        # Calculate daily yields
-        bond_daily_yield = request.bond_yield / 365
-        reit_daily_yield = request.reit_yield / 365
-        crypto_daily_yield = request.crypto_apy / 365
+        names, allocations, yields = self._sleeves(request)
+        capital = initial_capital * allocations
 
-        # Simulate daily income
-        daily_income = []
-        cumulative_income = 0
+        # Only the sampled chart days are ever materialized
+        n_points = min(request.chart_points, time_horizon)
+        days = np.unique(np.linspace(1, time_horizon, n_points).round().astype(int))
+        daily, cumulative = income_series(capital, yields, days, request.reinvest)
+        _, totals = income_series(capital, yields, np.array([time_horizon]), request.reinvest)
+        totals = totals[:, 0]
 
-        for day in range(time_horizon):
-            # Calculate daily income from each asset
-            bond_income = bond_capital * bond_daily_yield
-            reit_income = reit_capital * reit_daily_yield
-            crypto_income = crypto_capital * crypto_daily_yield
-
-            total_daily_income = bond_income + reit_income + crypto_income
-            cumulative_income += total_daily_income
-
-            daily_income.append({
-                "day": day + 1,
-                "bond_income": bond_income,
-                "reit_income": reit_income,
-                "crypto_income": crypto_income,
-                "total_daily_income": total_daily_income,
-                "cumulative_income": cumulative_income
-            })
-
-        # Calculate summary statistics
-        total_income = cumulative_income
+        total_income = float(totals.sum())
         annualized_yield = (total_income / initial_capital) * \
             (365 / time_horizon)
 
-        # Breakdown by asset
-        bond_total_income = bond_capital * \
-            request.bond_yield * (time_horizon / 365)
-        reit_total_income = reit_capital * \
-            request.reit_yield * (time_horizon / 365)
-        crypto_total_income = crypto_capital * \
-            request.crypto_apy * (time_horizon / 365)
+        income_keys = [f"{name}_income" for name in names]
+        total_daily = daily.sum(axis=0)
+        total_cumulative = cumulative.sum(axis=0)
 
         return {
             "initial_capital": initial_capital,
             "time_horizon_days": time_horizon,
+            "reinvest": request.reinvest,
             "allocations": {
-                "bonds": bond_allocation,
-                "reits": reit_allocation,
-                "crypto": crypto_allocation
+                self._allocation_key(name): float(a) for name, a in zip(names, allocations)
             },
             "capital_allocation": {
-                "bonds": bond_capital,
-                "reits": reit_capital,
-                "crypto": crypto_capital
+                self._allocation_key(name): float(c) for name, c in zip(names, capital)
             },
             "yields": {
-                "bond_yield": request.bond_yield,
-                "reit_yield": request.reit_yield,
-                "crypto_apy": request.crypto_apy
+                self._yield_key(name): float(y) for name, y in zip(names, yields)
             },
             "income_breakdown": {
-                "bond_income": bond_total_income,
-                "reit_income": reit_total_income,
-                "crypto_income": crypto_total_income,
+                **{key: float(t) for key, t in zip(income_keys, totals)},
                 "total_income": total_income
             },
             "summary": {
                 "total_income": total_income,
                 "annualized_yield": annualized_yield,
                 "income_per_day": total_income / time_horizon,
-                "income_per_month": total_income / (time_horizon / 30)
+                "income_per_month": total_income / (time_horizon / 30),
+                "final_value": initial_capital + total_income
             },
-            # Return first 30 days for chart
-            "daily_income": daily_income[:30],
+            "daily_income": [
+                {
+                    "day": int(day),
+                    **{key: float(daily[i, j]) for i, key in enumerate(income_keys)},
+                    "total_daily_income": float(total_daily[j]),
+                    "cumulative_income": float(total_cumulative[j])
+                }
+                for j, day in enumerate(days)
+            ],
             "chart_data": {
-                "dates": [f"Day {i+1}" for i in range(min(30, time_horizon))],
-                "bond_income": [day["bond_income"] for day in daily_income[:30]],
-                "reit_income": [day["reit_income"] for day in daily_income[:30]],
-                "crypto_income": [day["crypto_income"] for day in daily_income[:30]],
-                "total_income": [day["total_daily_income"] for day in daily_income[:30]],
-                "cumulative_income": [day["cumulative_income"] for day in daily_income[:30]]
+                "dates": [f"Day {day}" for day in days],
+                **{key: daily[i].tolist() for i, key in enumerate(income_keys)},
+                "total_income": total_daily.tolist(),
+                "cumulative_income": total_cumulative.tolist()
             }
         }
+
+    def _sleeves(self, request: YieldSimRequest) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """Sleeve names, allocations and annual yields as aligned arrays"""
+        if request.sleeves:
+            names = list(request.sleeves)
+            allocations = [request.sleeves[n].allocation for n in names]
+            yields = [request.sleeves[n].annual_yield for n in names]
+        else:
+            names = list(LEGACY_SLEEVES)
+            allocations = [request.bond_allocation, request.reit_allocation, request.crypto_allocation]
+            yields = [request.bond_yield, request.reit_yield, request.crypto_apy]
+        return names, np.array(allocations, dtype=float), np.array(yields, dtype=float)
+
+    def _allocation_key(self, name: str) -> str:
+        return LEGACY_SLEEVES[name][0] if name in LEGACY_SLEEVES else name
+
+    def _yield_key(self, name: str) -> str:
+        return LEGACY_SLEEVES[name][1] if name in LEGACY_SLEEVES else f"{name}_yield"
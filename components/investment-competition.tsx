@@ -188,30 +188,32 @@ export default function InvestmentCompetition({
   const [loadingQuotes, setLoadingQuotes] = useState(false);
   const [quoteError, setQuoteError] = useState<string | null>(null);
 
-  // Fetch backend /quotes
+  // Fetch backend /quotes once, then apply pushed updates from /quotes/stream
   useEffect(() => {
-    let timer: ReturnType<typeof setInterval> | null = null;
+    // Build repeated parameters: ?ids=a&ids=b...
+    const ids = investmentOptions.map((o) => o.id);
+    const params = new URLSearchParams();
+    ids.forEach((id) => params.append("ids", id));
+
+    const applyQuotes = (list: any[], replace: boolean) => {
+      setQuotes((prev) => {
+        const map: Record<string, Quote> = replace ? {} : { ...prev };
+        (list ?? []).forEach((q: any) => {
+          map[q.id] = { currentPrice: q.currentPrice, change: q.change };
+        });
+        return map;
+      });
+    };
 
     const fetchQuotes = async () => {
       try {
         setLoadingQuotes(true);
         setQuoteError(null);
 
-        // Build repeated parameters: ?ids=a&ids=b...
-        const ids = investmentOptions.map((o) => o.id);
-        const params = new URLSearchParams();
-        ids.forEach((id) => params.append("ids", id));
-        const url = `${API_BASE}/quotes?${params.toString()}`;
-
-        const res = await fetch(url);
+        const res = await fetch(`${API_BASE}/quotes?${params.toString()}`);
         if (!res.ok) throw new Error(`HTTP ${res.status}`);
         const data = await res.json();
-
-        const map: Record<string, Quote> = {};
-        (data?.quotes ?? []).forEach((q: any) => {
-          map[q.id] = { currentPrice: q.currentPrice, change: q.change };
-        });
-        setQuotes(map);
+        applyQuotes(data?.quotes, true);
       } catch (e: any) {
         setQuoteError(e?.message ?? "Failed to fetch quotes");
       } finally {
@@ -220,11 +222,19 @@ export default function InvestmentCompetition({
     };
 
     fetchQuotes();
-    // Polling refresh (adjustable, currently 30s)
-    timer = setInterval(fetchQuotes, 30000);
+
+    // Server pushes a snapshot on connect, then only quotes that changed
+    const source = new EventSource(`${API_BASE}/quotes/stream?${params.toString()}`);
+    source.addEventListener("snapshot", (event) => {
+      applyQuotes(JSON.parse((event as MessageEvent).data)?.quotes, true);
+      setQuoteError(null);
+    });
+    source.addEventListener("quotes", (event) => {
+      applyQuotes(JSON.parse((event as MessageEvent).data)?.quotes, false);
+    });
 
     return () => {
-      if (timer) clearInterval(timer);
+      source.close();
     };
   }, []);
 
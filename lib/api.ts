@@ -59,6 +59,30 @@ export interface SimulationResponse {
   };
 }
 
+export interface MonteCarloRequest extends SimulationRequest {
+  n_paths?: number;
+  seed?: number;
+  chart_points?: number;
+}
+
+type Percentiles = Record<"p5" | "p25" | "p50" | "p75" | "p95", number>;
+
+export interface MonteCarloResponse {
+  n_paths: number;
+  expected_final_value: number;
+  probability_of_loss: number;
+  final_value_percentiles: Percentiles;
+  percentile_bands: { dates: string[] } & Record<
+    "p5" | "p25" | "p50" | "p75" | "p95",
+    number[]
+  >;
+  drawdown_distribution: {
+    mean: number;
+    percentiles: Percentiles;
+    histogram: { bin_edges: number[]; counts: number[] };
+  };
+}
+
 export interface CoachRequest {
   player_level: "beginner" | "intermediate" | "advanced";
   current_portfolio: Record<string, number>;
@@ -133,6 +157,26 @@ export interface CoachChatResponse {
   reply: string;
 }
 
+// Parse a newline-delimited JSON body one record at a time
+async function* readNdjson(
+  body: ReadableStream<Uint8Array>
+): AsyncGenerator<Record<string, any>> {
+  const reader = body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = "";
+  while (true) {
+    const { done, value } = await reader.read();
+    buffered += decoder.decode(value, { stream: !done });
+    const lines = buffered.split("\n");
+    buffered = lines.pop() ?? "";
+    for (const line of lines) {
+      if (line.trim()) yield JSON.parse(line);
+    }
+    if (done) break;
+  }
+  if (buffered.trim()) yield JSON.parse(buffered);
+}
+
 export const api = {
   // Health check
   async healthCheck(): Promise<{ status: string; timestamp: string }> {
@@ -151,15 +195,29 @@ export const api = {
   // Get price data
   async getPrices(
     tickers: string[],
-    period: string = "1y"
+    period: string = "1y",
+    maxPoints?: number
   ): Promise<PriceData> {
+    const resolution = maxPoints ? `&max_points=${maxPoints}` : "";
     const response = await fetch(
-      `${API_BASE}/prices?tickers=${tickers.join(",")}&period=${period}`
+      `${API_BASE}/prices?tickers=${tickers.join(",")}&period=${period}${resolution}`
     );
     if (!response.ok) throw new Error("Failed to fetch price data");
     return response.json();
   },
 
+  // Stream price chunks (one NDJSON record per ticker chunk) as they arrive
+  async *streamPrices(
+    tickers: string[],
+    layout: "records" | "columnar" = "columnar"
+  ): AsyncGenerator<Record<string, any>> {
+    const response = await fetch(
+      `${API_BASE}/prices?tickers=${tickers.join(",")}&layout=${layout}&format=ndjson`
+    );
+    if (!response.ok || !response.body) throw new Error("Failed to fetch price data");
+    yield* readNdjson(response.body);
+  },
+
   // Simulate investment
   async simulateInvestment(
     request: SimulationRequest
@@ -173,6 +231,19 @@ export const api = {
     return response.json();
   },
 
+  // Monte Carlo fan chart over many simulated paths
+  async simulateMonteCarlo(
+    request: MonteCarloRequest
+  ): Promise<MonteCarloResponse> {
+    const response = await fetch(`${API_BASE}/simulate/monte-carlo`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(request),
+    });
+    if (!response.ok) throw new Error("Monte Carlo simulation failed");
+    return response.json();
+  },
+
   // Get AI coach advice
   async getCoachAdvice(request: CoachRequest): Promise<CoachResponse> {
     const response = await fetch(`${API_BASE}/coach`, {
@@ -224,6 +295,23 @@ export const api = {
     return response.json();
   },
 
+  // Optimize one asset universe for several risk tolerances in one call
+  async optimizePortfolioBatch(
+    available_assets: string[],
+    risk_tolerances: number[]
+  ): Promise<any> {
+    const response = await fetch(`${API_BASE}/optimize/batch`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({
+        universe: { available_assets },
+        risk_tolerances,
+      }),
+    });
+    if (!response.ok) throw new Error("Batch portfolio optimization failed");
+    return response.json();
+  },
+
   // Rebalance portfolio
   async rebalancePortfolio(
     current_weights: Record<string, number>,
@@ -274,10 +362,12 @@ export const api = {
     ticker: string,
     start_date: string,
     end_date: string,
-    initial_investment: number = 100000
+    initial_investment: number = 100000,
+    maxPoints?: number
   ): Promise<InvestmentMetrics> {
+    const resolution = maxPoints ? `&max_points=${maxPoints}` : "";
     const response = await fetch(
-      `${API_BASE}/investment-metrics/${ticker}?start_date=${start_date}&end_date=${end_date}&initial_investment=${initial_investment}`
+      `${API_BASE}/investment-metrics/${ticker}?start_date=${start_date}&end_date=${end_date}&initial_investment=${initial_investment}${resolution}`
     );
     if (!response.ok) throw new Error("Failed to fetch investment metrics");
     return response.json();